@@ -0,0 +1,45 @@
+"""visit_timestamp not null
+
+Revision ID: 2b9f4d7e1c86
+Revises: 7a2c5e8b1f34
+Create Date: 2026-10-18 15:31:04.118230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2b9f4d7e1c86'
+down_revision: Union[str, None] = '7a2c5e8b1f34'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Keyset cursors and the stats rollup need a timestamp on every visit. Ids follow insert
+    # order, so a row that never got one borrows the closest dated visit before it (or after
+    # it), and only falls back to now when no visit is dated at all.
+    now = "now() AT TIME ZONE 'utc'" if op.get_bind().dialect.name == "postgresql" else "CURRENT_TIMESTAMP"
+    op.execute(
+        "UPDATE visit_data SET visit_timestamp = COALESCE("
+        "(SELECT earlier.visit_timestamp FROM visit_data AS earlier"
+        " WHERE earlier.id < visit_data.id AND earlier.visit_timestamp IS NOT NULL"
+        " ORDER BY earlier.id DESC LIMIT 1), "
+        "(SELECT later.visit_timestamp FROM visit_data AS later"
+        " WHERE later.id > visit_data.id AND later.visit_timestamp IS NOT NULL"
+        " ORDER BY later.id LIMIT 1), "
+        f"{now}) "
+        "WHERE visit_timestamp IS NULL"
+    )
+    with op.batch_alter_table('visit_data') as batch_op:
+        batch_op.alter_column('visit_timestamp', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('visit_data') as batch_op:
+        batch_op.alter_column('visit_timestamp', existing_type=sa.DateTime(), nullable=True)
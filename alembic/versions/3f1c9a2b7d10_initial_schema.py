@@ -0,0 +1,71 @@
+"""initial schema
+
+Revision ID: 3f1c9a2b7d10
+Revises: 
+Create Date: 2026-10-18 09:12:41.528301
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c9a2b7d10'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_detail',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(), nullable=True),
+    sa.Column('phone_number', sa.String(), nullable=True),
+    sa.Column('first_name', sa.String(), nullable=True),
+    sa.Column('last_name', sa.String(), nullable=True),
+    sa.Column('hashed_password', sa.String(), nullable=True),
+    sa.Column('active', sa.Boolean(), nullable=True),
+    sa.Column('register_date', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('user_id'),
+    sa.UniqueConstraint('email'),
+    sa.UniqueConstraint('phone_number')
+    )
+    op.create_table('admin',
+    sa.Column('admin_id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('active', sa.Boolean(), nullable=True),
+    sa.Column('register_date', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user_detail.user_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('admin_id'),
+    sa.UniqueConstraint('user_id')
+    )
+    op.create_table('visit_data',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('hs_unique_code', sa.String(), nullable=False),
+    sa.Column('filename', sa.String(), nullable=False),
+    sa.Column('file_data', sa.LargeBinary(), nullable=False),
+    sa.Column('content_type', sa.String(), nullable=False),
+    sa.Column('place_name', sa.String(), nullable=False),
+    sa.Column('person_name', sa.String(), nullable=False),
+    sa.Column('address', sa.String(), nullable=False),
+    sa.Column('person_position', sa.String(), nullable=True),
+    sa.Column('latitude', sa.Float(), nullable=True),
+    sa.Column('longitude', sa.Float(), nullable=True),
+    sa.Column('visit_timestamp', sa.DateTime(), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user_detail.user_id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_visit_data_id'), 'visit_data', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_visit_data_id'), table_name='visit_data')
+    op.drop_table('visit_data')
+    op.drop_table('admin')
+    op.drop_table('user_detail')
@@ -0,0 +1,40 @@
+"""visit search text
+
+Revision ID: 4c7e9a1d2f60
+Revises: a93d6b2e5f08
+Create Date: 2026-10-18 14:12:47.509113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c7e9a1d2f60'
+down_revision: Union[str, None] = 'a93d6b2e5f08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing rows are filled by `python -m application.cli backfill-search-text`.
+    op.add_column('visit_data', sa.Column('search_text', sa.Text(), nullable=True))
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_visit_data_search_text_trgm', 'visit_data', ['search_text'], unique=False,
+            postgresql_using='gin', postgresql_ops={'search_text': 'gin_trgm_ops'}, postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.drop_index('ix_visit_data_search_text_trgm', table_name='visit_data', postgresql_concurrently=True)
+    op.drop_column('visit_data', 'search_text')
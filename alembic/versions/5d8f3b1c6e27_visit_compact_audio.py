@@ -0,0 +1,32 @@
+"""visit compact audio
+
+Revision ID: 5d8f3b1c6e27
+Revises: c52a7e0d94b1
+Create Date: 2026-10-18 11:48:12.907314
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d8f3b1c6e27'
+down_revision: Union[str, None] = 'c52a7e0d94b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('visit_data', sa.Column('compact_file_hash', sa.String(length=64), nullable=True))
+    op.add_column('visit_data', sa.Column('compact_file_size', sa.BigInteger(), nullable=True))
+    op.add_column('visit_data', sa.Column('compact_content_type', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('visit_data', 'compact_content_type')
+    op.drop_column('visit_data', 'compact_file_size')
+    op.drop_column('visit_data', 'compact_file_hash')
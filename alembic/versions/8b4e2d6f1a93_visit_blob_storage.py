@@ -0,0 +1,35 @@
+"""visit blob storage
+
+Revision ID: 8b4e2d6f1a93
+Revises: 3f1c9a2b7d10
+Create Date: 2026-10-18 09:20:05.114872
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b4e2d6f1a93'
+down_revision: Union[str, None] = '3f1c9a2b7d10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('visit_data', sa.Column('file_hash', sa.String(length=64), nullable=True))
+    op.add_column('visit_data', sa.Column('file_size', sa.BigInteger(), nullable=True))
+    op.create_index(op.f('ix_visit_data_file_hash'), 'visit_data', ['file_hash'], unique=False)
+    op.alter_column('visit_data', 'file_data', existing_type=sa.LargeBinary(), nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Rows already moved to blob storage must be restored with file_data before this runs.
+    op.alter_column('visit_data', 'file_data', existing_type=sa.LargeBinary(), nullable=False)
+    op.drop_index(op.f('ix_visit_data_file_hash'), table_name='visit_data')
+    op.drop_column('visit_data', 'file_size')
+    op.drop_column('visit_data', 'file_hash')
@@ -0,0 +1,36 @@
+"""visit geohash
+
+Revision ID: a93d6b2e5f08
+Revises: e7a41c09b3d5
+Create Date: 2026-10-18 13:05:22.384610
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a93d6b2e5f08'
+down_revision: Union[str, None] = 'e7a41c09b3d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing rows are filled by `python -m application.cli backfill-geohash`.
+    op.add_column('visit_data', sa.Column('geohash', sa.String(length=12), nullable=True))
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_visit_data_geohash', 'visit_data', ['geohash'], unique=False,
+            postgresql_ops={'geohash': 'varchar_pattern_ops'}, postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_visit_data_geohash', table_name='visit_data', postgresql_concurrently=True)
+    op.drop_column('visit_data', 'geohash')
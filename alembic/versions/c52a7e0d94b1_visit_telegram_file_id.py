@@ -0,0 +1,28 @@
+"""visit telegram file id
+
+Revision ID: c52a7e0d94b1
+Revises: 8b4e2d6f1a93
+Create Date: 2026-10-18 11:02:37.640215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c52a7e0d94b1'
+down_revision: Union[str, None] = '8b4e2d6f1a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('visit_data', sa.Column('telegram_file_id', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('visit_data', 'telegram_file_id')
@@ -0,0 +1,43 @@
+"""visit stats rollups
+
+Revision ID: d18f6c3a9e42
+Revises: 4c7e9a1d2f60
+Create Date: 2026-10-18 15:20:11.730264
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd18f6c3a9e42'
+down_revision: Union[str, None] = '4c7e9a1d2f60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Fill history with `python -m application.cli rebuild-visit-stats`.
+    op.create_table('visit_stats_day',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('visit_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day')
+    )
+    op.create_table('visit_stats_user_day',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('visit_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user_detail.user_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('day', 'user_id')
+    )
+    op.create_index('ix_visit_stats_user_day_user_day', 'visit_stats_user_day', ['user_id', 'day'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_visit_stats_user_day_user_day', table_name='visit_stats_user_day')
+    op.drop_table('visit_stats_user_day')
+    op.drop_table('visit_stats_day')
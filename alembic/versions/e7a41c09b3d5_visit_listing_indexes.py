@@ -0,0 +1,39 @@
+"""visit listing indexes
+
+Revision ID: e7a41c09b3d5
+Revises: 5d8f3b1c6e27
+Create Date: 2026-10-18 12:31:54.271093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a41c09b3d5'
+down_revision: Union[str, None] = '5d8f3b1c6e27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = (
+    ('ix_visit_data_timestamp_id', ['visit_timestamp', 'id']),
+    ('ix_visit_data_user_timestamp_id', ['user_id', 'visit_timestamp', 'id']),
+    ('ix_visit_data_hs_code_timestamp_id', ['hs_unique_code', 'visit_timestamp', 'id']),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY keeps visit_data writable while the indexes build; it cannot run in a transaction.
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES:
+            op.create_index(name, 'visit_data', columns, unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, _ in INDEXES:
+            op.drop_index(name, table_name='visit_data', postgresql_concurrently=True)
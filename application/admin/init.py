@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException, Depends, Form
-from sqlalchemy.orm import Session
-from application import crud, schemas
+from sqlalchemy.ext.asyncio import AsyncSession
+from application import async_crud, schemas
 from application.helper import endpoint_helper
 
 FILE_NAME = 'admin:init'
@@ -15,12 +15,12 @@ router = APIRouter(
 @handle_errors
 async def init_admin(
     admin: schemas.SignUpRequirement,
-    db: Session = Depends(endpoint_helper.get_db)
+    db: AsyncSession = Depends(endpoint_helper.get_async_db)
 ):
-    existing_admin = crud.get_first_admin(db)
+    existing_admin = await async_crud.get_first_admin(db)
     if existing_admin:
         raise HTTPException(status_code=400, detail="Admin already exists")
-    user = crud.create_user(db, admin)
-    admin = crud.register_new_admin(db, user.user_id, True)
+    user = await async_crud.create_user(db, admin)
+    admin = await async_crud.register_new_admin(db, user.user_id, True)
 
     return {"message": "Admin initialized successfully", "admin_id": admin.admin_id}
@@ -1,10 +1,12 @@
+from datetime import date
+from typing import Literal
 from fastapi import APIRouter, Depends, HTTPException, Request
-from application import crud, schemas
-from sqlalchemy.orm import Session
-from application.helper import endpoint_helper
+from application import async_crud, schemas, stats
+from sqlalchemy.ext.asyncio import AsyncSession
+from application.helper import endpoint_helper, notifier
 from application.logger_config import logger
 from application.setting import settings
-from application import tasks
+from application.database import sync_pool_metrics, async_pool_metrics
 
 FILE_NAME = 'admin:manage'
 handle_errors = endpoint_helper.handle_endpoint_errors(FILE_NAME)
@@ -14,9 +16,9 @@ router = APIRouter(
     tags=['hardware_communication']
 )
 
-def require_admin(
+async def require_admin(
     request: Request,
-    db: Session = Depends(endpoint_helper.get_db)
+    db: AsyncSession = Depends(endpoint_helper.get_async_db)
 ):
     user = request.state.user
     if not user:
@@ -26,7 +28,7 @@ def require_admin(
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    is_admin = crud.is_user_admin(db, user_id)
+    is_admin = await async_crud.get_admin_principal(db, user_id)
     if not is_admin:
         raise HTTPException(status_code=403, detail="Admin access only")
 
@@ -34,28 +36,32 @@ def require_admin(
 
 @router.post('/new_admin', response_model=schemas.NewAdminResult)
 @handle_errors
-async def new_admin(admin: schemas.NewAdminRequirement, db: Session = Depends(endpoint_helper.get_db), is_admin = Depends(require_admin)):
-    new = crud.register_new_admin(db, admin.user_id, admin.status)
-    message = (f"🔵 New Admin Registered!"
-               f"\n\nUserID: {admin.user_id}"
-               f"\nAdminID: {new.admin_id}"
-               f"\nAdmin Status: {admin.status}"
-               f"\n\n- Removed by Admin With ID {is_admin.admin_id}")
-
-    tasks.report_to_admin_api.delay(message, message_thread_id=settings.INFO_THREAD_ID)
-    logger.info(f"{FILE_NAME}:new_admin", extra={"msg_": message})
+async def new_admin(admin: schemas.NewAdminRequirement, db: AsyncSession = Depends(endpoint_helper.get_async_db), is_admin = Depends(require_admin)):
+    def new_admin_message(new):
+        return (f"🔵 New Admin Registered!"
+                f"\n\nUserID: {admin.user_id}"
+                f"\nAdminID: {new.admin_id}"
+                f"\nAdmin Status: {admin.status}"
+                f"\n\n- Removed by Admin With ID {is_admin.admin_id}")
+
+    new = await async_crud.register_new_admin(
+        db, admin.user_id, admin.status,
+        before_commit=lambda new: notifier.notify(db, new_admin_message(new), settings.INFO_THREAD_ID)
+    )
+    logger.info(f"{FILE_NAME}:new_admin", extra={"msg_": new_admin_message(new)})
     return new
 
 @router.delete('/remove_admin/{admin_id}')
 @handle_errors
-async def remove_admin(admin_id: int, db: Session = Depends(endpoint_helper.get_db), is_admin= Depends(require_admin)):
-    result = crud.remove_admin(db, admin_id)
+async def remove_admin(admin_id: int, db: AsyncSession = Depends(endpoint_helper.get_async_db), is_admin= Depends(require_admin)):
+    message = (f"🔵 Admin Removed!"
+               f"\nAdminID: {admin_id}"
+               f"\n\n- Removed by Admin With ID {is_admin.admin_id}")
+    result = await async_crud.remove_admin(
+        db, admin_id, before_commit=lambda admin: notifier.notify(db, message, settings.INFO_THREAD_ID)
+    )
     if result:
-        message = (f"🔵 Admin Removed!"
-                   f"\nAdminID: {admin_id}"
-                   f"\n\n- Removed by Admin With ID {is_admin.admin_id}")
         logger.info(f"{FILE_NAME}:remove_admin", extra={"msg_": message})
-        tasks.report_to_admin_api.delay(message, message_thread_id=settings.INFO_THREAD_ID)
         return {"status": "admin removed!"}
 
     raise HTTPException(
@@ -66,26 +72,67 @@ async def remove_admin(admin_id: int, db: Session = Depends(endpoint_helper.get_
 
 @router.post('/create_user/')
 @handle_errors
-async def create_user(user: schemas.SignUpRequirement, request: Request, db: Session = Depends(endpoint_helper.get_db), is_admin= Depends(require_admin)):
+async def create_user(user: schemas.SignUpRequirement, request: Request, db: AsyncSession = Depends(endpoint_helper.get_async_db), is_admin= Depends(require_admin)):
 
-    db_user = crud.get_user_by_phone_number(db, user.phone_number)
+    db_user = await async_crud.get_user_by_phone_number(db, user.phone_number)
     if db_user: raise HTTPException(status_code=400, detail="this user already exists!")
 
-    create_user_db = crud.create_user(db, user)
-
     client_ip = request.client.host if request.client else None
     user_agent = request.headers.get("user-agent")
 
-    extra = {"phone_number": user.phone_number, "first_name": user.first_name,
-              'last_name': user.last_name, 'user_id': create_user_db.user_id, 'password': user.password,
-              "ip_address": client_ip, "user_agent": user_agent, "admin_id": is_admin.admin_id}
-
-    logger.info(f"{FILE_NAME}:create_user", extra=extra)
-    msg = "👤 New User Registered!\n"
+    def registration_details(new_user):
+        return {"phone_number": user.phone_number, "first_name": user.first_name,
+                'last_name': user.last_name, 'user_id': new_user.user_id, 'password': user.password,
+                "ip_address": client_ip, "user_agent": user_agent, "admin_id": is_admin.admin_id}
 
-    for key, value in extra.items():
-        msg += f"\n{key}: {value}"
+    def notify_new_user(new_user):
+        msg = "👤 New User Registered!\n"
+        for key, value in registration_details(new_user).items():
+            msg += f"\n{key}: {value}"
+        notifier.notify(db, msg, settings.NEW_USER_THREAD_ID)
 
-    tasks.report_to_admin_api.delay(msg, message_thread_id=settings.NEW_USER_THREAD_ID)
+    create_user_db = await async_crud.create_user(db, user, before_commit=notify_new_user)
+    logger.info(f"{FILE_NAME}:create_user", extra=registration_details(create_user_db))
 
     return {'msg': 'user created', 'user_id': create_user_db.user_id}
+
+
+@router.get('/pool_stats')
+@handle_errors
+async def pool_stats(is_admin = Depends(require_admin)):
+    return {
+        "api": async_pool_metrics.snapshot(),
+        "sync": sync_pool_metrics.snapshot(),
+    }
+
+
+@router.get('/visit_stats', response_model=list[schemas.VisitStatsBucket])
+@handle_errors
+async def visit_stats(
+    date_from: date,
+    date_to: date,
+    period: Literal['day', 'week', 'month'] = 'day',
+    by: Literal['total', 'user'] = 'total',
+    user_id: int = None,
+    hs_unique_code: str = None,
+    db: AsyncSession = Depends(endpoint_helper.get_async_db),
+    is_admin = Depends(require_admin)
+):
+    """Visit counts per day/week/month, optionally split by rep.
+
+    Summed from the daily rollups; narrowing to one hs_unique_code counts that
+    shop's visits through its visit_data index instead.
+    """
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail='date_from must not be after date_to')
+    if (date_to - date_from).days > settings.STATS_MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f'At most {settings.STATS_MAX_RANGE_DAYS} days per query')
+
+    if hs_unique_code is not None:
+        visits = await async_crud.get_shop_visits(db, hs_unique_code, date_from, date_to, user_id)
+        return stats.bucket_visits(visits, period, by)
+    rows = await async_crud.get_visit_stats(db, date_from, date_to, period, by, user_id)
+    return [
+        {"period": row.period, "user_id": row.user_id if by == "user" else None, "visit_count": row.visit_count}
+        for row in rows
+    ]
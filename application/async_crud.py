@@ -0,0 +1,284 @@
+import math
+from datetime import timedelta
+from types import SimpleNamespace
+from sqlalchemy import select, insert, tuple_, or_, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+from application import models, schemas
+from application.helper import principal_cache
+from application.helper.time_helpers import naive_utc
+from application.hashers import hash_password
+from application.setting import settings
+from application import text_normalization, stats, geo
+from application.crud import build_user, build_visit_record, visit_record_values
+
+async def get_user_by_phone_number(db: AsyncSession, phone_number: str):
+    return await db.scalar(select(models.User).filter(models.User.phone_number == phone_number).limit(1))
+
+async def is_user_admin(db: AsyncSession, user_id: str):
+    return await db.scalar(select(models.Admin).filter_by(user_id=user_id, active=True).limit(1))
+
+async def get_visit_metadata(db: AsyncSession, visit_id: int):
+    return await db.scalar(select(models.VisitData).filter_by(id=visit_id).limit(1))
+
+async def get_visit_brief(db: AsyncSession, visit_id: int):
+    result = await db.execute(
+        select(
+            models.VisitData.id, models.VisitData.user_id, models.VisitData.hs_unique_code,
+            models.VisitData.place_name, models.VisitData.visit_timestamp
+        ).filter_by(id=visit_id).limit(1)
+    )
+    return result.first()
+
+async def get_visit_file_data(db: AsyncSession, visit_id: int):
+    return await db.scalar(select(models.VisitData.file_data).filter_by(id=visit_id))
+
+async def get_first_admin(db: AsyncSession):
+    return await db.scalar(select(models.Admin).limit(1))
+
+async def create_user(db: AsyncSession, user: schemas.SignUpRequirement, before_commit=None):
+    """``before_commit(db_user)`` runs after the flush, e.g. to stage outbox notifications in the same transaction."""
+    db_user = build_user(user, await hash_password(user.password))
+    db.add(db_user)
+    await db.flush()
+    if before_commit:
+        before_commit(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    await principal_cache.invalidate("user", db_user.user_id)
+    return db_user
+
+
+async def register_new_admin(db: AsyncSession, user_id: int, active: bool, before_commit=None):
+    new_admin = models.Admin(user_id=user_id, active=active)
+    db.add(new_admin)
+    await db.flush()
+    if before_commit:
+        before_commit(new_admin)
+    await db.commit()
+    await db.refresh(new_admin)
+    await principal_cache.invalidate("admin", user_id)
+    return new_admin
+
+async def remove_admin(db: AsyncSession, admin_id: int, before_commit=None):
+    admin = await db.scalar(select(models.Admin).filter(models.Admin.admin_id == admin_id).limit(1))
+    if not admin:
+        return None
+    await db.delete(admin)
+    if before_commit:
+        before_commit(admin)
+    await db.commit()
+    await principal_cache.invalidate("admin", admin.user_id)
+    return True
+
+async def get_user_by_user_id(db: AsyncSession, user_id: int):
+    return await db.scalar(select(models.User).filter_by(user_id=user_id, active=True).limit(1))
+
+async def update_user_password(db: AsyncSession, db_user: models.User, hashed_password: str):
+    db_user.hashed_password = hashed_password
+    await db.commit()
+    return db_user
+
+async def get_user_principal(db: AsyncSession, user_id: int):
+    return await principal_cache.get(
+        "user", user_id, schemas.UserPrincipal, lambda: get_user_by_user_id(db, user_id)
+    )
+
+async def get_admin_principal(db: AsyncSession, user_id: int):
+    return await principal_cache.get(
+        "admin", user_id, schemas.AdminPrincipal, lambda: is_user_admin(db, user_id)
+    )
+
+async def record_visit_stats(db: AsyncSession, visits):
+    for statement in stats.increment_statements(db.get_bind().dialect.name, stats.count_visits(visits)):
+        await db.execute(statement)
+
+async def add_new_visit_entry(
+        db: AsyncSession, user_id: int, filename: str, hs_unique_code: str, file_hash: str, file_size: int,
+        place_name: str, person_name: str, address: str, person_position: str,
+        latitude: float, longitude: float, description: str, content_type: str,
+        before_commit=None
+):
+    visit_record = build_visit_record(
+        user_id, filename, hs_unique_code, file_hash, file_size,
+        place_name, person_name, address, person_position,
+        latitude, longitude, description, content_type
+    )
+    db.add(visit_record)
+    await db.flush()
+    await record_visit_stats(db, [visit_record])
+    if before_commit:
+        before_commit(visit_record)
+    await db.commit()
+    await db.refresh(visit_record)
+
+    return visit_record
+
+async def add_visit_entries(db: AsyncSession, entries, before_commit=None):
+    """Insert several visits (``add_new_visit_entry`` argument tuples) with one
+    multi-row INSERT ... RETURNING and a single commit; rows come back in input order."""
+    statement = insert(models.VisitData).returning(
+        models.VisitData.id, models.VisitData.visit_timestamp, sort_by_parameter_order=True
+    )
+    values = [visit_record_values(*entry) for entry in entries]
+    rows = (await db.execute(statement, values)).all()
+    await record_visit_stats(db, [
+        SimpleNamespace(user_id=value["user_id"], visit_timestamp=row.visit_timestamp)
+        for value, row in zip(values, rows)
+    ])
+    if before_commit:
+        before_commit(rows)
+    await db.commit()
+    return rows
+
+VISIT_SUMMARY_COLUMNS = (
+    models.VisitData.id, models.VisitData.user_id, models.VisitData.hs_unique_code,
+    models.VisitData.filename, models.VisitData.content_type, models.VisitData.file_size,
+    models.VisitData.place_name, models.VisitData.person_name, models.VisitData.address,
+    models.VisitData.person_position, models.VisitData.latitude, models.VisitData.longitude,
+    models.VisitData.visit_timestamp, models.VisitData.description,
+)
+
+def filter_visits(query, user_id: int = None, hs_unique_code: str = None, date_from=None, date_to=None):
+    if user_id is not None:
+        query = query.filter(models.VisitData.user_id == user_id)
+    if hs_unique_code is not None:
+        query = query.filter(models.VisitData.hs_unique_code == hs_unique_code)
+    if date_from is not None:
+        query = query.filter(models.VisitData.visit_timestamp >= naive_utc(date_from))
+    if date_to is not None:
+        query = query.filter(models.VisitData.visit_timestamp < naive_utc(date_to))
+    return query
+
+async def list_visits(
+        db: AsyncSession, limit: int, after=None, user_id: int = None, hs_unique_code: str = None,
+        date_from=None, date_to=None
+):
+    """Newest-first page of visits without audio columns; ``after`` is a ``(visit_timestamp, id)`` keyset cursor."""
+    query = filter_visits(
+        select(models.VisitData).options(load_only(*VISIT_SUMMARY_COLUMNS)),
+        user_id, hs_unique_code, date_from, date_to
+    )
+    if after is not None:
+        query = query.filter(tuple_(models.VisitData.visit_timestamp, models.VisitData.id) < tuple_(*after))
+
+    query = query.order_by(models.VisitData.visit_timestamp.desc(), models.VisitData.id.desc()).limit(limit)
+    return (await db.scalars(query)).all()
+
+async def get_max_visit_id(db: AsyncSession):
+    return await db.scalar(select(func.max(models.VisitData.id)))
+
+async def stream_visits(db: AsyncSession, up_to_id: int, extra_columns=(), **filters):
+    """Matching visits in id order through a server-side cursor, EXPORT_BATCH_SIZE rows per fetch."""
+    query = filter_visits(
+        select(models.VisitData).options(load_only(*VISIT_SUMMARY_COLUMNS, *extra_columns)), **filters
+    )
+    query = (
+        query.filter(models.VisitData.id <= up_to_id)
+        .order_by(models.VisitData.id)
+        .execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+    )
+    return await db.stream_scalars(query)
+
+def visits_in_box_query(geohash_prefixes, min_lat, min_lon, max_lat, max_lon):
+    """Visits inside the box; the geohash prefixes narrow the scan to a few index ranges first."""
+    return (
+        select(models.VisitData)
+        .options(load_only(*VISIT_SUMMARY_COLUMNS))
+        .filter(or_(*(models.VisitData.geohash.like(f"{prefix}%") for prefix in geohash_prefixes)))
+        .filter(
+            models.VisitData.latitude.between(min_lat, max_lat),
+            models.VisitData.longitude.between(min_lon, max_lon),
+        )
+    )
+
+async def find_visits_in_box(db: AsyncSession, geohash_prefixes, min_lat, min_lon, max_lat, max_lon, limit: int):
+    query = (
+        visits_in_box_query(geohash_prefixes, min_lat, min_lon, max_lat, max_lon)
+        .order_by(models.VisitData.visit_timestamp.desc(), models.VisitData.id.desc())
+        .limit(limit)
+    )
+    return (await db.scalars(query)).all()
+
+async def find_visits_nearest(db: AsyncSession, latitude: float, longitude: float, radius_km: float, limit: int):
+    """Up to ``limit`` visits in the circle's bounding box, nearest first.
+
+    Orders by squared equirectangular distance, which needs no trigonometry in
+    SQL and ranks like the haversine distance at these radii, so the limit
+    cuts off the farthest candidates rather than the oldest.
+    """
+    box = geo.radius_box(latitude, longitude, radius_km)
+    lon_scale = math.cos(math.radians(latitude))
+    d_lat = models.VisitData.latitude - latitude
+    d_lon = (models.VisitData.longitude - longitude) * lon_scale
+    query = (
+        visits_in_box_query(geo.cover_box(*box), *box)
+        .order_by(d_lat * d_lat + d_lon * d_lon, models.VisitData.id)
+        .limit(limit)
+    )
+    return (await db.scalars(query)).all()
+
+async def search_visits(db: AsyncSession, text: str, limit: int):
+    """Visits whose normalised text contains every query term, best matches first.
+
+    Callers must pass at least one term of ``MIN_TERM_LENGTH`` characters:
+    those LIKE filters are what the GIN trigram index answers on Postgres,
+    and shorter terms only recheck the rows it found. At most
+    SEARCH_MAX_CANDIDATES matches are ranked, by ``word_similarity`` on
+    Postgres and in process elsewhere, so ranking cost stays bounded however
+    common the terms are.
+    """
+    terms = text_normalization.search_terms(text)
+    if not text_normalization.has_indexable_term(terms):
+        return []
+    phrase = " ".join(terms)
+    postgres = db.get_bind().dialect.name == "postgresql"
+
+    matches = select(models.VisitData.id)
+    for term in terms:
+        matches = matches.filter(models.VisitData.search_text.like(f"%{text_normalization.escape_like(term)}%", escape="\\"))
+    if not postgres:
+        matches = matches.order_by(models.VisitData.id.desc())
+    # No ORDER BY on Postgres: ordering by id lets the planner walk the primary key backwards and
+    # test LIKE row by row, whereas an unordered cap is served straight from the trigram index.
+    candidate_ids = matches.limit(settings.SEARCH_MAX_CANDIDATES)
+
+    query = (
+        select(models.VisitData)
+        .options(load_only(*VISIT_SUMMARY_COLUMNS, models.VisitData.search_text))
+        .filter(models.VisitData.id.in_(candidate_ids.scalar_subquery()))
+    )
+    if postgres:
+        rank = func.word_similarity(phrase, models.VisitData.search_text)
+        query = query.order_by(rank.desc(), models.VisitData.id.desc()).limit(limit)
+        return (await db.scalars(query)).all()
+
+    candidates = (await db.scalars(query)).all()
+    candidates = sorted(
+        candidates, key=lambda visit: text_normalization.score_match(visit.search_text, terms, phrase), reverse=True
+    )
+    return candidates[:limit]
+
+async def get_visit_stats(db: AsyncSession, date_from, date_to, period: str, by: str, user_id: int = None):
+    """``(period, user_id, visit_count)`` rows summed in the database from the rollups; never touches visit_data."""
+    model = models.VisitStatsUserDay if by == "user" or user_id is not None else models.VisitStatsDay
+    period_start = stats.period_expression(db.get_bind().dialect.name, model.day, period).label("period")
+    columns = [period_start, model.user_id] if by == "user" else [period_start]
+    query = select(*columns, func.sum(model.visit_count).label("visit_count")).filter(
+        model.day >= date_from, model.day <= date_to
+    )
+    if user_id is not None:
+        query = query.filter(model.user_id == user_id)
+    query = query.group_by(*columns).order_by(*columns)
+    return (await db.execute(query)).all()
+
+async def get_shop_visits(db: AsyncSession, hs_unique_code: str, date_from, date_to, user_id: int = None):
+    """``(user_id, visit_timestamp)`` of one hs_unique_code's visits on business days ``[date_from, date_to]``."""
+    query = select(models.VisitData.user_id, models.VisitData.visit_timestamp).filter(
+        models.VisitData.hs_unique_code == hs_unique_code,
+        models.VisitData.visit_timestamp >= stats.day_start_utc(date_from),
+        models.VisitData.visit_timestamp < stats.day_start_utc(date_to + timedelta(days=1))
+    )
+    if user_id is not None:
+        query = query.filter(models.VisitData.user_id == user_id)
+    return (await db.execute(query)).all()
@@ -0,0 +1,36 @@
+import os
+import shutil
+import subprocess
+from application.setting import settings
+
+COMPACT_CONTENT_TYPE = "audio/ogg"
+COMPACT_EXTENSION = ".ogg"
+
+
+class TranscodeError(Exception):
+    pass
+
+
+def codec_available() -> bool:
+    return shutil.which(settings.FFMPEG_BINARY) is not None
+
+
+def compact_filename(filename: str) -> str:
+    return os.path.splitext(filename)[0] + COMPACT_EXTENSION
+
+
+def transcode_to_opus(source_path: str, target_path: str) -> None:
+    """Mono, loudness-normalised Opus in an Ogg container (what Telegram plays as a voice note)."""
+    command = [
+        settings.FFMPEG_BINARY, "-nostdin", "-hide_banner", "-loglevel", "error", "-y",
+        "-i", source_path,
+        "-vn", "-ac", "1", "-ar", "48000", "-af", "loudnorm",
+        "-c:a", "libopus", "-b:a", settings.TRANSCODE_BITRATE, "-application", "voip",
+        "-f", "ogg", target_path,
+    ]
+    try:
+        subprocess.run(command, check=True, capture_output=True, timeout=settings.TRANSCODE_TIMEOUT)
+    except subprocess.CalledProcessError as e:
+        raise TranscodeError(e.stderr.decode(errors="replace")[-2000:])
+    except subprocess.TimeoutExpired:
+        raise TranscodeError(f"ffmpeg timed out after {settings.TRANSCODE_TIMEOUT}s")
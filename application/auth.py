@@ -5,11 +5,16 @@ from hashlib import md5
 from fastapi import HTTPException
 from application.setting import settings
 
-def create_access_token(data: dict, expires_delta: timedelta = timedelta(minutes=settings.ACCESS_TOKEN_EXP_MIN)):
+def issue_access_token(data: dict, expires_delta: timedelta = timedelta(minutes=settings.ACCESS_TOKEN_EXP_MIN)):
+    """Return the encoded access token together with the payload it carries."""
     to_encode = data.copy()
     expire = datetime.now() + expires_delta
     to_encode.update({"exp": int(expire.timestamp())})
-    return jwt.encode(to_encode, settings.ACCESS_TOKEN_SECRET_KEY, algorithm=settings.ALGORITHM)
+    return jwt.encode(to_encode, settings.ACCESS_TOKEN_SECRET_KEY, algorithm=settings.ALGORITHM), to_encode
+
+def create_access_token(data: dict, expires_delta: timedelta = timedelta(minutes=settings.ACCESS_TOKEN_EXP_MIN)):
+    token, _ = issue_access_token(data, expires_delta)
+    return token
 
 def create_refresh_token(data: dict, expires_delta: timedelta = timedelta(minutes=settings.REFRESH_TOKEN_EXP_MIN)):
     to_encode = data.copy()
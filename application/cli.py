@@ -0,0 +1,150 @@
+import argparse
+import time
+from datetime import date, timedelta
+from application import crud, outbox
+from application.setting import settings
+from application.database import SessionLocal
+from application.logger_config import celery_logger as logger
+
+
+def backfill_voice_blobs(batch_size: int, pause: float):
+    """Move inline ``visit_data.file_data`` bytes into blob storage.
+
+    Each batch is its own short transaction and rows already moved are skipped,
+    so the command can be stopped and re-run at any time.
+    """
+    moved = 0
+    while True:
+        db = SessionLocal()
+        try:
+            visit_ids = crud.get_visit_ids_pending_blob_backfill(db, batch_size)
+            if not visit_ids:
+                break
+            for visit_id in visit_ids:
+                crud.move_visit_file_to_storage(db, visit_id)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        moved += len(visit_ids)
+        logger.info("cli:backfill_voice_blobs", extra={"moved": moved, "last_visit_id": visit_ids[-1]})
+        if pause:
+            time.sleep(pause)
+
+    logger.info("cli:backfill_voice_blobs finished", extra={"moved": moved})
+
+
+def run_keyset_backfill(name: str, backfill_batch, batch_size: int, pause: float):
+    """Run ``backfill_batch(db, after_id, batch_size)`` until it returns None, one transaction per batch."""
+    last_id, batches = 0, 0
+    while last_id is not None:
+        db = SessionLocal()
+        try:
+            batch_last_id = backfill_batch(db, last_id, batch_size)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        if batch_last_id is not None:
+            batches += 1
+            logger.info(f"cli:{name}", extra={"batches": batches, "last_visit_id": batch_last_id})
+            if pause:
+                time.sleep(pause)
+        last_id = batch_last_id
+
+    logger.info(f"cli:{name} finished", extra={"batches": batches})
+
+
+def backfill_geohashes(batch_size: int, pause: float):
+    """Compute ``visit_data.geohash`` for rows inserted before it existed; safe to re-run."""
+    run_keyset_backfill("backfill_geohashes", crud.backfill_visit_geohashes, batch_size, pause)
+
+
+def backfill_search_text(batch_size: int, pause: float):
+    """Build ``visit_data.search_text`` for rows inserted before search existed; safe to re-run."""
+    run_keyset_backfill("backfill_search_text", crud.backfill_visit_search_text, batch_size, pause)
+
+
+def rebuild_visit_stats(from_day: date, to_day: date):
+    """Recompute the daily visit rollups from visit_data, one calendar month per transaction.
+
+    Each month holds the rollup write lock only while it is recounted, so
+    uploads queue briefly instead of for the whole rebuild. Missing bounds
+    default to the first/last day that has visits or rollup rows.
+    """
+    db = SessionLocal()
+    try:
+        first_day, last_day = crud.get_visit_stats_bounds(db)
+    finally:
+        db.close()
+    from_day, to_day = from_day or first_day, to_day or last_day
+    if from_day is None or to_day is None:
+        logger.info("cli:rebuild_visit_stats nothing to rebuild")
+        return
+
+    months = 0
+    start = from_day
+    while start <= to_day:
+        end = min((start.replace(day=1) + timedelta(days=32)).replace(day=1) - timedelta(days=1), to_day)
+        db = SessionLocal()
+        try:
+            days, user_days = crud.rebuild_visit_stats(db, start, end)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        logger.info("cli:rebuild_visit_stats month", extra={"from_day": str(start), "to_day": str(end),
+                                                            "days": days, "user_days": user_days})
+        months += 1
+        start = end + timedelta(days=1)
+    logger.info("cli:rebuild_visit_stats finished", extra={"months": months, "from_day": str(from_day),
+                                                          "to_day": str(to_day)})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m application.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backfill = commands.add_parser("backfill-blobs", help="move inline voice files into blob storage")
+    backfill.add_argument("--batch-size", type=int, default=100)
+    backfill.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+
+    geohash = commands.add_parser("backfill-geohash", help="compute geohash cells for existing visits")
+    geohash.add_argument("--batch-size", type=int, default=1000)
+    geohash.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+
+    search = commands.add_parser("backfill-search-text", help="build normalised search text for existing visits")
+    search.add_argument("--batch-size", type=int, default=1000)
+    search.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+
+    rebuild = commands.add_parser("rebuild-visit-stats", help="recompute the daily visit statistics rollups")
+    rebuild.add_argument("--from-day", type=date.fromisoformat, default=None, help="first day (YYYY-MM-DD) to rebuild")
+    rebuild.add_argument("--to-day", type=date.fromisoformat, default=None, help="last day (YYYY-MM-DD) to rebuild")
+
+    relay = commands.add_parser("relay-outbox", help="publish outbox messages to the Celery broker (runs forever)")
+    relay.add_argument("--batch-size", type=int, default=settings.OUTBOX_BATCH_SIZE)
+    relay.add_argument("--poll-interval", type=float, default=settings.OUTBOX_POLL_INTERVAL)
+
+    args = parser.parse_args(argv)
+    if args.command == "backfill-blobs":
+        backfill_voice_blobs(args.batch_size, args.pause)
+    elif args.command == "backfill-geohash":
+        backfill_geohashes(args.batch_size, args.pause)
+    elif args.command == "backfill-search-text":
+        backfill_search_text(args.batch_size, args.pause)
+    elif args.command == "rebuild-visit-stats":
+        rebuild_visit_stats(args.from_day, args.to_day)
+    elif args.command == "relay-outbox":
+        outbox.run_relay(args.batch_size, args.poll_interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,77 +1,166 @@
+from datetime import timedelta
+from sqlalchemy import func, text
 from sqlalchemy.orm import Session
-from application import models, schemas
-from application.auth import hash_password_md5
+from application import models, schemas, storage, geo, stats
+from application.text_normalization import build_search_text
+from application.setting import settings
 
 def get_user_by_phone_number(db: Session, phone_number: str):
     return db.query(models.User).filter(models.User.phone_number == phone_number).first()
 
-def is_user_admin(db: Session, user_id: str):
-    return db.query(models.Admin).filter_by(user_id=user_id, active=True).first()
-
-def get_visit_by_visit_id(db: Session, visit_id: int):
+def get_visit_metadata(db: Session, visit_id: int):
     return db.query(models.VisitData).filter_by(id=visit_id).first()
 
-def get_first_admin(db: Session):
-    return db.query(models.Admin).first()
+def get_visit_file_data(db: Session, visit_id: int):
+    return db.query(models.VisitData.file_data).filter_by(id=visit_id).scalar()
+
+def set_visit_telegram_file_id(db: Session, visit_id: int, file_id: str):
+    db.query(models.VisitData).filter_by(id=visit_id).update({"telegram_file_id": file_id}, synchronize_session=False)
+
+def set_visit_compact_file(db: Session, visit_id: int, file_hash: str, file_size: int, content_type: str):
+    db.query(models.VisitData).filter_by(id=visit_id).update({
+        "compact_file_hash": file_hash,
+        "compact_file_size": file_size,
+        "compact_content_type": content_type,
+    }, synchronize_session=False)
 
-def create_user(db: Session, user: schemas.SignUpRequirement):
-    hash_password = hash_password_md5(user.password)
-    db_user = models.User(
+def build_user(user: schemas.SignUpRequirement, hashed_password: str):
+    return models.User(
         first_name=user.first_name,
         email=user.email,
         last_name=user.last_name,
         phone_number=user.phone_number,
-        hashed_password=hash_password,
+        hashed_password=hashed_password,
         active=user.active
     )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
-
-
-def register_new_admin(db: Session, user_id: int, active: bool):
-    new_admin = models.Admin(user_id=user_id, active=active)
-    db.add(new_admin)
-    db.commit()
-    db.refresh(new_admin)
-    return new_admin
-
-def remove_admin(db: Session, admin_id: int):
-    admin = db.query(models.Admin).filter(models.Admin.admin_id == admin_id).first()
-    if not admin:
-        return None
-    db.delete(admin)
-    db.commit()
-    return True
-
-def get_user_by_user_id(db: Session, user_id: int):
-    return db.query(models.User).filter_by(user_id=user_id, active=True).first()
 
-def add_new_visit_entry(
-        db: Session, user_id: int, file, hs_unique_code: str, file_bytes,
+def visit_record_values(
+        user_id: int, filename: str, hs_unique_code: str, file_hash: str, file_size: int,
         place_name: str, person_name: str, address: str, person_position: str,
         latitude: float, longitude: float, description: str, content_type: str
 ):
-
-    visit_record = models.VisitData(
+    return dict(
         user_id=user_id,
         hs_unique_code=hs_unique_code,
-        filename=file.filename,
-        file_data=file_bytes,
+        filename=filename,
+        file_hash=file_hash,
+        file_size=file_size,
         place_name=place_name,
         person_name=person_name,
         address=address,
         person_position=person_position,
         latitude=latitude,
         longitude=longitude,
+        geohash=geo.encode(latitude, longitude) if latitude is not None and longitude is not None else None,
         description=description,
+        search_text=build_search_text(place_name, person_name, address, description),
         content_type=content_type
     )
 
-    db.add(visit_record)
-    db.commit()
-    db.refresh(visit_record)
+def build_visit_record(
+        user_id: int, filename: str, hs_unique_code: str, file_hash: str, file_size: int,
+        place_name: str, person_name: str, address: str, person_position: str,
+        latitude: float, longitude: float, description: str, content_type: str
+):
+    return models.VisitData(**visit_record_values(
+        user_id, filename, hs_unique_code, file_hash, file_size,
+        place_name, person_name, address, person_position,
+        latitude, longitude, description, content_type
+    ))
+
+def get_visit_ids_pending_blob_backfill(db: Session, batch_size: int):
+    return [
+        row.id for row in
+        db.query(models.VisitData.id)
+        .filter(models.VisitData.file_hash.is_(None), models.VisitData.file_data.isnot(None))
+        .order_by(models.VisitData.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ]
+
+def move_visit_file_to_storage(db: Session, visit_id: int):
+    file_bytes = get_visit_file_data(db, visit_id)
+    if file_bytes is None:
+        return None
+    file_hash = storage.get_storage().put(file_bytes)
+    db.query(models.VisitData).filter_by(id=visit_id).update(
+        {"file_hash": file_hash, "file_size": len(file_bytes), "file_data": None},
+        synchronize_session=False
+    )
+    return file_hash
+
+def backfill_visit_geohashes(db: Session, after_id: int, batch_size: int):
+    """Fill ``geohash`` for one batch of rows with coordinates; returns the last id seen."""
+    rows = (
+        db.query(models.VisitData.id, models.VisitData.latitude, models.VisitData.longitude)
+        .filter(
+            models.VisitData.id > after_id,
+            models.VisitData.geohash.is_(None),
+            models.VisitData.latitude.isnot(None),
+            models.VisitData.longitude.isnot(None),
+        )
+        .order_by(models.VisitData.id)
+        .limit(batch_size)
+        .all()
+    )
+    for row in rows:
+        db.query(models.VisitData).filter_by(id=row.id).update(
+            {"geohash": geo.encode(row.latitude, row.longitude)}, synchronize_session=False
+        )
+    return rows[-1].id if rows else None
+
+def backfill_visit_search_text(db: Session, after_id: int, batch_size: int):
+    """Fill ``search_text`` for one batch of rows; returns the last id seen."""
+    rows = (
+        db.query(
+            models.VisitData.id, models.VisitData.place_name, models.VisitData.person_name,
+            models.VisitData.address, models.VisitData.description
+        )
+        .filter(models.VisitData.id > after_id, models.VisitData.search_text.is_(None))
+        .order_by(models.VisitData.id)
+        .limit(batch_size)
+        .all()
+    )
+    for row in rows:
+        db.query(models.VisitData).filter_by(id=row.id).update(
+            {"search_text": build_search_text(row.place_name, row.person_name, row.address, row.description)},
+            synchronize_session=False
+        )
+    return rows[-1].id if rows else None
+
+def get_visit_stats_bounds(db: Session):
+    """First and last day present in visit_data or either rollup; ``(None, None)`` when all are empty."""
+    first_visit, last_visit = db.query(
+        func.min(models.VisitData.visit_timestamp), func.max(models.VisitData.visit_timestamp)
+    ).one()
+    days = [stats.visit_day(first_visit), stats.visit_day(last_visit)] if first_visit is not None else []
+    for model in (models.VisitStatsDay, models.VisitStatsUserDay):
+        days.extend(day for day in db.query(func.min(model.day), func.max(model.day)).one() if day is not None)
+    return (min(days), max(days)) if days else (None, None)
 
-    return visit_record
+def rebuild_visit_stats(db: Session, from_day, to_day):
+    """Recompute both visit rollups for ``[from_day, to_day]`` (inclusive) from visit_data.
 
+    On PostgreSQL the rollup tables are locked against writes first (readers
+    are not blocked), so a visit committed meanwhile either is already in the
+    recount or waits for this transaction and then adds onto the rebuilt
+    numbers; no live increment is lost. Keep the range short.
+    """
+    dialect_name = db.get_bind().dialect.name
+    if dialect_name == "postgresql":
+        # Same table order as stats.increment_statements, so writers queue instead of deadlocking.
+        db.execute(text("LOCK TABLE visit_stats_day, visit_stats_user_day IN SHARE ROW EXCLUSIVE MODE"))
+    for model in (models.VisitStatsDay, models.VisitStatsUserDay):
+        db.query(model).filter(model.day >= from_day, model.day <= to_day).delete(synchronize_session=False)
+
+    visits = db.query(models.VisitData.user_id, models.VisitData.visit_timestamp).filter(
+        models.VisitData.visit_timestamp >= stats.day_start_utc(from_day),
+        models.VisitData.visit_timestamp < stats.day_start_utc(to_day + timedelta(days=1))
+    )
+    days, user_days = stats.count_visits(visits.yield_per(settings.EXPORT_BATCH_SIZE))
+    day_items, user_day_items = sorted(days.items()), sorted(user_days.items())
+    for start in range(0, max(len(day_items), len(user_day_items)), 1000):
+        counts = dict(day_items[start:start + 1000]), dict(user_day_items[start:start + 1000])
+        for statement in stats.increment_statements(dialect_name, counts):
+            db.execute(statement)
+    return len(day_items), len(user_day_items)
@@ -1,8 +1,63 @@
+import os
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 from application.setting import settings
+from application.helper.pool_metrics import PoolMetrics, instrumented_pool_class, watch_engine
+from application.helper.metrics import watch_queries
 
-engine = create_engine(settings.DATABASE_URL)
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def get_async_database_url():
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    url = make_url(settings.DATABASE_URL)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+
+def pool_options(pool_size: int, max_overflow: int):
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+sync_pool_metrics = PoolMetrics("sync")
+async_pool_metrics = PoolMetrics("async")
+
+# Sync engine: Celery tasks, CLI commands and Alembic.
+engine = create_engine(
+    settings.DATABASE_URL,
+    poolclass=instrumented_pool_class(QueuePool, sync_pool_metrics),
+    **pool_options(settings.WORKER_DB_POOL_SIZE, settings.WORKER_DB_MAX_OVERFLOW)
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+watch_engine(engine, sync_pool_metrics)
+watch_queries(engine, "sync")
+
+# Async engine: FastAPI request handlers.
+async_engine = create_async_engine(
+    get_async_database_url(),
+    poolclass=instrumented_pool_class(AsyncAdaptedQueuePool, async_pool_metrics),
+    **pool_options(settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW)
+)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+watch_engine(async_engine.sync_engine, async_pool_metrics)
+watch_queries(async_engine.sync_engine, "async")
+
+
+def reset_pools_after_fork():
+    """Drop pooled connections inherited from the parent; each process opens its own on first use."""
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+
+os.register_at_fork(after_in_child=reset_pools_after_fork)
+
 Base = declarative_base()
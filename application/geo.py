@@ -0,0 +1,76 @@
+import math
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+GEOHASH_PRECISION = 9  # ~5m cells; shorter prefixes address larger cells
+MAX_COVER_CELLS = 32
+
+
+def encode(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    geohash = []
+    bits, bit_count, even = 0, 0, True
+    while len(geohash) < precision:
+        value, interval = (longitude, lon_range) if even else (latitude, lat_range)
+        mid = (interval[0] + interval[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            interval[0] = mid
+        else:
+            bits <<= 1
+            interval[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            geohash.append(BASE32[bits])
+            bits, bit_count = 0, 0
+    return "".join(geohash)
+
+
+def cell_size(precision: int):
+    """``(lat_degrees, lon_degrees)`` covered by one cell at ``precision``."""
+    total_bits = 5 * precision
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+
+def cover_box(min_lat: float, min_lon: float, max_lat: float, max_lon: float):
+    """Geohash prefixes whose cells together cover the box.
+
+    Uses the longest prefix length that needs at most MAX_COVER_CELLS cells,
+    so each prefix turns into a narrow index range scan.
+    """
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        lat_step, lon_step = cell_size(precision)
+        rows = math.floor(max_lat / lat_step) - math.floor(min_lat / lat_step) + 1
+        cols = math.floor(max_lon / lon_step) - math.floor(min_lon / lon_step) + 1
+        if rows * cols <= MAX_COVER_CELLS:
+            break
+
+    cells = set()
+    for row in range(rows):
+        lat = min(min_lat + row * lat_step, max_lat)
+        for col in range(cols):
+            lon = min(min_lon + col * lon_step, max_lon)
+            cells.add(encode(lat, lon, precision))
+    return sorted(cells)
+
+
+def radius_box(latitude: float, longitude: float, radius_km: float):
+    """Bounding box ``(min_lat, min_lon, max_lat, max_lon)`` around a circle."""
+    lat_delta = radius_km / KM_PER_DEGREE_LAT
+    lon_delta = radius_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(latitude)), 1e-6))
+    return (
+        max(latitude - lat_delta, -90.0), max(longitude - lon_delta, -180.0),
+        min(latitude + lat_delta, 90.0), min(longitude + lon_delta, 180.0),
+    )
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
@@ -0,0 +1,134 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import secrets
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from application.auth import hash_password_md5
+from application.setting import settings
+
+
+class PasswordHasher:
+    """One password hashing algorithm.
+
+    Encoded hashes are stored as ``<algorithm>$<params...>`` in
+    ``User.hashed_password`` so several algorithms can coexist.
+    """
+    algorithm = None
+
+    def encode(self, password: str) -> str:
+        raise NotImplementedError
+
+    def verify(self, password: str, encoded: str) -> bool:
+        raise NotImplementedError
+
+    def needs_update(self, encoded: str) -> bool:
+        return False
+
+
+class MD5PasswordHasher(PasswordHasher):
+    """Legacy unsalted MD5, stored as bare hex without an algorithm prefix."""
+    algorithm = "md5"
+
+    def encode(self, password: str) -> str:
+        return hash_password_md5(password)
+
+    def verify(self, password: str, encoded: str) -> bool:
+        return hmac.compare_digest(hash_password_md5(password), encoded)
+
+
+class PBKDF2PasswordHasher(PasswordHasher):
+    algorithm = "pbkdf2_sha256"
+
+    def _derive(self, password: str, salt: str, iterations: int) -> str:
+        digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt.encode(), iterations)
+        return base64.b64encode(digest).decode()
+
+    def encode(self, password: str) -> str:
+        salt = secrets.token_hex(16)
+        iterations = settings.PBKDF2_ITERATIONS
+        return f"{self.algorithm}${iterations}${salt}${self._derive(password, salt, iterations)}"
+
+    def verify(self, password: str, encoded: str) -> bool:
+        _, iterations, salt, expected = encoded.split("$", 3)
+        return hmac.compare_digest(self._derive(password, salt, int(iterations)), expected)
+
+    def needs_update(self, encoded: str) -> bool:
+        return int(encoded.split("$", 2)[1]) != settings.PBKDF2_ITERATIONS
+
+
+class ScryptPasswordHasher(PasswordHasher):
+    algorithm = "scrypt"
+
+    def _derive(self, password: str, salt: str, n: int, r: int, p: int) -> str:
+        digest = hashlib.scrypt(password.encode(), salt=salt.encode(), n=n, r=r, p=p, maxmem=256 * n * r, dklen=64)
+        return base64.b64encode(digest).decode()
+
+    def encode(self, password: str) -> str:
+        salt = secrets.token_hex(16)
+        n, r, p = settings.SCRYPT_N, settings.SCRYPT_R, settings.SCRYPT_P
+        return f"{self.algorithm}${n}${r}${p}${salt}${self._derive(password, salt, n, r, p)}"
+
+    def verify(self, password: str, encoded: str) -> bool:
+        _, n, r, p, salt, expected = encoded.split("$", 5)
+        return hmac.compare_digest(self._derive(password, salt, int(n), int(r), int(p)), expected)
+
+    def needs_update(self, encoded: str) -> bool:
+        params = tuple(int(value) for value in encoded.split("$", 4)[1:4])
+        return params != (settings.SCRYPT_N, settings.SCRYPT_R, settings.SCRYPT_P)
+
+
+HASHERS = {hasher.algorithm: hasher for hasher in (MD5PasswordHasher(), PBKDF2PasswordHasher(), ScryptPasswordHasher())}
+
+
+def identify_hasher(encoded: str) -> PasswordHasher:
+    if "$" not in encoded:
+        return HASHERS[MD5PasswordHasher.algorithm]
+    algorithm = encoded.split("$", 1)[0]
+    try:
+        return HASHERS[algorithm]
+    except KeyError:
+        raise ValueError(f"Unknown password hash algorithm: {algorithm}")
+
+
+def make_password(password: str) -> str:
+    return HASHERS[settings.PASSWORD_HASHER].encode(password)
+
+
+def check_password(password: str, encoded: str):
+    """Return ``(valid, needs_rehash)`` for a stored hash."""
+    if not encoded:
+        return False, False
+    hasher = identify_hasher(encoded)
+    if not hasher.verify(password, encoded):
+        return False, False
+    return True, hasher.algorithm != settings.PASSWORD_HASHER or hasher.needs_update(encoded)
+
+
+_executor = None
+
+
+def get_executor():
+    """Bounded pool for KDF work; hashlib releases the GIL, so threads scale with cores too."""
+    global _executor
+    if _executor is None:
+        if settings.PASSWORD_HASH_POOL == "process":
+            _executor = ProcessPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS)
+        else:
+            _executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def hash_password(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(get_executor(), make_password, password)
+
+
+async def verify_password(password: str, encoded: str):
+    return await asyncio.get_running_loop().run_in_executor(get_executor(), check_password, password, encoded)
@@ -0,0 +1,89 @@
+import asyncio
+import os
+import time
+from contextlib import AsyncExitStack
+import jwt
+from fastapi import APIRouter, FastAPI
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+from application import hashers, storage
+from application.auth import issue_access_token
+from application.database import async_engine
+from application.logger_config import logger
+from application.setting import settings
+from application.tasks import celery_app
+
+FILE_NAME = 'health'
+
+router = APIRouter(
+    prefix='/health',
+    tags=['health']
+)
+
+_ready = False
+
+
+def mark_ready(ready: bool = True):
+    global _ready
+    _ready = ready
+
+
+async def prefill_pool(connections: int):
+    """Open ``connections`` pooled connections at once so the first requests skip the connect handshake."""
+    async with AsyncExitStack() as stack:
+        for _ in range(connections):
+            connection = await stack.enter_async_context(async_engine.connect())
+            await connection.execute(text("SELECT 1"))
+
+
+def warm_broker():
+    with celery_app.producer_or_acquire() as producer:
+        producer.connection.ensure_connection(max_retries=1)
+
+
+async def warm_up(app: FastAPI):
+    """Pay the per-process first-request costs before the worker reports ready."""
+    start = time.perf_counter()
+    # A database that is down at boot must not kill the worker; /health/ready reports it instead.
+    try:
+        await prefill_pool(min(settings.WARMUP_POOL_CONNECTIONS or settings.DB_POOL_SIZE, settings.DB_POOL_SIZE))
+    except Exception as e:
+        logger.warning(f"{FILE_NAME}:warm_up database unavailable", extra={"error": str(e)})
+
+    token, _ = issue_access_token({"user_id": 0, "first_name": "warmup"})
+    jwt.decode(token, settings.ACCESS_TOKEN_SECRET_KEY, algorithms=settings.ALGORITHM)
+    app.openapi()
+    await hashers.verify_password("", "")
+    await run_in_threadpool(storage.get_storage)
+
+    # The API only publishes directly when an error report cannot reach the outbox, so a missing broker
+    # must not block readiness.
+    try:
+        await asyncio.wait_for(run_in_threadpool(warm_broker), settings.WARMUP_BROKER_TIMEOUT)
+    except Exception as e:
+        logger.warning(f"{FILE_NAME}:warm_up broker unavailable", extra={"error": str(e)})
+
+    logger.info(f"{FILE_NAME}:warm_up", extra={"pid": os.getpid(), "seconds": round(time.perf_counter() - start, 3)})
+
+
+async def ping_database():
+    async with async_engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+
+
+@router.get('/live')
+async def live():
+    return {"status": "alive", "pid": os.getpid()}
+
+
+@router.get('/ready')
+async def ready():
+    if not _ready:
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    try:
+        await asyncio.wait_for(ping_database(), settings.HEALTH_CHECK_TIMEOUT)
+    except Exception as e:
+        logger.warning(f"{FILE_NAME}:ready", extra={"error": str(e)})
+        return JSONResponse(status_code=503, content={"status": "database unavailable"})
+    return {"status": "ready", "pid": os.getpid()}
@@ -0,0 +1,42 @@
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Small in-process LRU whose entries also expire after ``ttl`` seconds.
+
+    Only used from the event loop, so there is no locking.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        value, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value, expires_at: float = None):
+        ttl_expiry = time.time() + self.ttl
+        expires_at = ttl_expiry if expires_at is None else min(expires_at, ttl_expiry)
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def pop(self, key):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
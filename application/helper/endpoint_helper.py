@@ -1,24 +1,30 @@
-from fastapi import Depends, HTTPException
-from sqlalchemy.orm import Session
-from application.database import SessionLocal
+from fastapi import Depends, HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
+from application.database import AsyncSessionLocal
 from application.tasks import report_to_admin_api
+from application.setting import settings
+from application import outbox, storage
 import traceback
 from uuid import uuid4
 from application.logger_config import logger
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    except Exception:
-        db.rollback()
-        raise
-    finally:
-        db.close()
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        except Exception:
+            await db.rollback()
+            raise
 
 from functools import wraps
 
-def log_and_report_error(context: str, error: Exception, extra: dict = None):
+async def log_and_report_error(context: str, error: Exception, extra: dict = None):
+    """Log ``error`` and stage its admin report in the outbox on a fresh session.
+
+    If the database cannot take the row either (often the cause of the 500),
+    the report is published from a worker thread so the event loop never
+    waits on the broker.
+    """
     tb = traceback.format_exc()
     error_id = uuid4().hex
     extra = extra or {}
@@ -33,26 +39,16 @@ def log_and_report_error(context: str, error: Exception, extra: dict = None):
         f"\n\nExtera Info:"
         f"\n{extra}"
     )
-    report_to_admin_api.delay(err_msg)
-
-def db_transaction(context: str):
-    def decorator(func):
-        @wraps(func)
-        async def wrapper(*args, db, **kwargs):
-            try:
-                return await func(*args, db=db, **kwargs)
-            except HTTPException as e:
-                raise e
-            except Exception as e:
-                db.rollback()
-                log_and_report_error(f"{context}:{func.__name__}", e, extra={})
-                raise HTTPException(status_code=500, detail={
-                    "message": "Internal server error",
-                    "type": type(e).__name__,
-                    "reason": str(e)
-                })
-        return wrapper
-    return decorator
+    try:
+        async with AsyncSessionLocal() as db:
+            outbox.enqueue(db, report_to_admin_api, err_msg)
+            await db.commit()
+    except Exception as e:
+        logger.warning(f"{context}: error report not staged in the outbox", extra={"error": str(e)})
+        try:
+            await run_in_threadpool(report_to_admin_api.delay, err_msg)
+        except Exception as e:
+            logger.warning(f"{context}: error report not published", extra={"error": str(e)})
 
 def handle_endpoint_errors(context: str):
     def decorator(func):
@@ -63,7 +59,7 @@ def handle_endpoint_errors(context: str):
             except HTTPException as e:
                 raise e
             except Exception as e:
-                log_and_report_error(f"{context}:{func.__name__}", e, extra={})
+                await log_and_report_error(f"{context}:{func.__name__}", e, extra={})
                 raise HTTPException(status_code=500, detail={
                     "message": "Internal server error",
                     "type": type(e).__name__,
@@ -74,3 +70,16 @@ def handle_endpoint_errors(context: str):
 
 def raise_empty_queue_exception():
     raise HTTPException(status_code=404, detail={'status': 'emptyQueue', "status_code": 3})
+
+async def store_upload(file: UploadFile):
+    """Stream an uploaded file into blob storage chunk by chunk; returns ``(hash, size)``."""
+    writer = await run_in_threadpool(storage.get_storage().writer, settings.MAX_UPLOAD_SIZE)
+    try:
+        while chunk := await file.read(settings.UPLOAD_CHUNK_SIZE):
+            await run_in_threadpool(writer.write, chunk)
+        return await run_in_threadpool(writer.commit)
+    except storage.BlobTooLarge:
+        raise HTTPException(status_code=413, detail="File is too large")
+    except BaseException:
+        await run_in_threadpool(writer.abort)
+        raise
@@ -0,0 +1,136 @@
+import csv
+import io
+import json
+import os
+import zipfile
+from datetime import datetime
+from starlette.concurrency import run_in_threadpool
+from application import async_crud, models, schemas, storage
+from application.database import AsyncSessionLocal
+from application.setting import settings
+
+EXPORT_FIELDS = list(schemas.VisitSummary.model_fields)
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "zip": "application/zip",
+}
+# ZIP entry dates can only hold 1980-01-01 .. 2107-12-31.
+ZIP_EPOCH = datetime(1980, 1, 1)
+ZIP_LATEST = datetime(2107, 12, 31, 23, 59, 58)
+
+
+class StreamSink(io.RawIOBase):
+    """Write-only, unseekable buffer that ``zipfile`` writes into and the response drains."""
+
+    def __init__(self):
+        super().__init__()
+        self._buffer = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._buffer += data
+        return len(data)
+
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def visit_row(visit) -> dict:
+    return schemas.VisitSummary.model_validate(visit).model_dump(mode="json")
+
+
+def audio_path(visit) -> str:
+    return f"audio/{visit.id}_{os.path.basename(visit.filename)}"
+
+
+async def ndjson_chunks(visits):
+    buffer = io.StringIO()
+    async for visit in visits:
+        buffer.write(json.dumps(visit_row(visit), ensure_ascii=False) + "\n")
+        if buffer.tell() >= settings.EXPORT_FLUSH_SIZE:
+            yield buffer.getvalue().encode()
+            buffer = io.StringIO()
+    yield buffer.getvalue().encode()
+
+
+async def csv_chunks(visits):
+    buffer = io.StringIO()
+    buffer.write("\ufeff")  # lets Excel detect UTF-8 for the Persian columns
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    async for visit in visits:
+        writer.writerow(visit_row(visit))
+        if buffer.tell() >= settings.EXPORT_FLUSH_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+async def zip_chunks(db, up_to_id: int, filters: dict):
+    """``visits.ndjson`` (with an ``audio_path`` per row) followed by ``audio/<id>_<filename>``.
+
+    Two passes over the same id range, so metadata never has to be held
+    while the audio is written. Audio is already compressed and is stored as is.
+    """
+    sink = StreamSink()
+    archive = zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED)
+
+    with archive.open("visits.ndjson", "w", force_zip64=True) as entry:
+        async for visit in await async_crud.stream_visits(db, up_to_id, **filters):
+            row = visit_row(visit)
+            row["audio_path"] = audio_path(visit)
+            entry.write((json.dumps(row, ensure_ascii=False) + "\n").encode())
+            if sink.pending() >= settings.EXPORT_FLUSH_SIZE:
+                yield sink.drain()
+
+    extra_columns = (models.VisitData.file_hash,)
+    async for visit in await async_crud.stream_visits(db, up_to_id, extra_columns=extra_columns, **filters):
+        timestamp = min(max(visit.visit_timestamp, ZIP_EPOCH), ZIP_LATEST)
+        info = zipfile.ZipInfo(audio_path(visit), date_time=timestamp.timetuple()[:6])
+        info.compress_type = zipfile.ZIP_STORED
+        info.file_size = visit.file_size or 0
+        if visit.file_hash:
+            blob = await run_in_threadpool(storage.get_storage().open, visit.file_hash)
+        else:
+            # Legacy row whose audio still lives in the table; read it on a separate connection.
+            async with AsyncSessionLocal() as legacy_db:
+                blob = io.BytesIO(await async_crud.get_visit_file_data(legacy_db, visit.id) or b"")
+            info.file_size = len(blob.getbuffer())
+
+        with blob, archive.open(info, "w", force_zip64=info.file_size > zipfile.ZIP64_LIMIT) as entry:
+            while chunk := await run_in_threadpool(blob.read, storage.CHUNK_SIZE):
+                entry.write(chunk)
+                yield sink.drain()
+
+    archive.close()
+    yield sink.drain()
+
+
+async def export_visits(export_format: str, filters: dict):
+    """Response body for GET /visit/export.
+
+    Runs on its own session: the request's session is closed before a
+    streaming body is iterated.
+    """
+    async with AsyncSessionLocal() as db:
+        up_to_id = await async_crud.get_max_visit_id(db)
+        if up_to_id is None:
+            up_to_id = 0
+        if export_format == "zip":
+            chunks = zip_chunks(db, up_to_id, filters)
+        elif export_format == "csv":
+            chunks = csv_chunks(await async_crud.stream_visits(db, up_to_id, **filters))
+        else:
+            chunks = ndjson_chunks(await async_crud.stream_visits(db, up_to_id, **filters))
+        async for chunk in chunks:
+            if chunk:
+                yield chunk
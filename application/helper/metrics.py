@@ -0,0 +1,212 @@
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from celery import signals
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# Per-request accumulator ``[db_queries, db_seconds, publish_seconds]`` set by the metrics middleware.
+# The endpoint task inherits the context, so engine and Celery hooks add to the same list.
+request_usage = ContextVar("request_usage", default=None)
+
+
+class Metric:
+    """Base for in-process metrics.
+
+    Each thread writes to its own shard, so recording never takes a lock;
+    ``render`` merges the shards when /metrics is scraped.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "values", None)
+        if shard is None:
+            shard = self._local.values = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def _merged(self) -> dict:
+        with self._shards_lock:
+            shards = list(self._shards)
+        merged = {}
+        for shard in shards:
+            for labels, value in list(shard.items()):
+                merged[labels] = self._merge(merged.get(labels), value)
+        return merged
+
+    def _merge(self, total, value):
+        return value if total is None else total + value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for labels, value in sorted(self._merged().items()):
+            yield from self._render_value(labels, value)
+
+    def _render_value(self, labels, value):
+        yield f"{self.name}{format_labels(self.labelnames, labels)} {value}"
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, labels=(), amount: float = 1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+
+class Gauge(Counter):
+    """Up/down gauge; shards hold deltas, so the merged sum is the current value."""
+
+    kind = "gauge"
+
+    def dec(self, labels=(), amount: float = 1):
+        self.inc(labels, -amount)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+
+    def observe(self, value: float, labels=()):
+        shard = self._shard()
+        state = shard.get(labels)
+        if state is None:
+            # per-bucket counts, then sum and count
+            state = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        state[bisect.bisect_left(self.buckets, value)] += 1
+        state[-2] += value
+        state[-1] += 1
+
+    def _merge(self, total, value):
+        return list(value) if total is None else [a + b for a, b in zip(total, value)]
+
+    def _render_value(self, labels, value):
+        cumulative = 0
+        for bound, count in zip(self.buckets + ("+Inf",), value):
+            cumulative += count
+            bucket_labels = format_labels(self.labelnames + ("le",), labels + (str(bound),))
+            yield f"{self.name}_bucket{bucket_labels} {cumulative}"
+        yield f"{self.name}_sum{format_labels(self.labelnames, labels)} {value[-2]}"
+        yield f"{self.name}_count{format_labels(self.labelnames, labels)} {value[-1]}"
+
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names, values) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in zip(names, values)) + "}"
+
+
+REGISTRY = []
+
+http_requests = Counter("http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+http_in_flight = Gauge("http_requests_in_flight", "HTTP requests currently being handled.")
+http_latency = Histogram(
+    "http_request_duration_seconds", "Time until the response starts, by route.", ("method", "route")
+)
+http_db_time = Histogram(
+    "http_request_db_seconds", "Database time spent per request, by route.", ("method", "route"), FAST_BUCKETS
+)
+http_db_queries = Histogram(
+    "http_request_db_queries", "Database queries issued per request, by route.", ("method", "route"), COUNT_BUCKETS
+)
+http_publish_time = Histogram(
+    "http_request_publish_seconds", "Celery broker publish time spent per request, by route.", ("method", "route"),
+    FAST_BUCKETS
+)
+rate_limited = Counter("rate_limited_requests_total", "Requests rejected with 429, by limit.", ("limit",))
+db_query_latency = Histogram("db_query_duration_seconds", "Cursor execute time, by engine.", ("engine",), FAST_BUCKETS)
+celery_publish_latency = Histogram(
+    "celery_publish_duration_seconds", "Broker publish time of .delay()/.apply_async(), by task.", ("task",),
+    FAST_BUCKETS
+)
+
+
+def render_pool(name: str, snapshot: dict):
+    labels = format_labels(("pool",), (name,))
+    for key in ("pool_size", "checked_out", "checked_in", "overflow_in_use"):
+        if key in snapshot:
+            yield f"db_pool_{key}{labels} {snapshot[key]}"
+    for key in ("connections_created", "connections_invalidated", "checkouts", "checkout_timeouts"):
+        yield f"db_pool_{key}_total{labels} {snapshot[key]}"
+    wait = snapshot["checkout_wait_seconds"]
+    for bound, count in wait["buckets"].items():
+        yield f'db_pool_checkout_wait_seconds_bucket{format_labels(("pool", "le"), (name, bound))} {count}'
+    yield f"db_pool_checkout_wait_seconds_sum{labels} {wait['sum']}"
+    yield f"db_pool_checkout_wait_seconds_count{labels} {wait['count']}"
+
+
+def render(pools: dict) -> str:
+    """Prometheus text exposition of every registered metric plus the ``{name: PoolMetrics}`` pools."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    for name, pool_metrics in pools.items():
+        lines.extend(render_pool(name, pool_metrics.snapshot()))
+    return "\n".join(lines) + "\n"
+
+
+def watch_queries(engine, name: str):
+    """Time every cursor execute on ``engine`` and charge it to the current request, if any."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        db_query_latency.observe(elapsed, (name,))
+        usage = request_usage.get()
+        if usage is not None:
+            usage[0] += 1
+            usage[1] += elapsed
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_start"):
+            connection.info["query_start"].pop()
+
+
+_publish_started = threading.local()
+
+
+@signals.before_task_publish.connect
+def before_task_publish(sender=None, headers=None, **kwargs):
+    _publish_started.at = time.perf_counter()
+
+
+@signals.after_task_publish.connect
+def after_task_publish(sender=None, headers=None, **kwargs):
+    started = getattr(_publish_started, "at", None)
+    if started is None:
+        return
+    _publish_started.at = None
+    elapsed = time.perf_counter() - started
+    celery_publish_latency.observe(elapsed, (sender,))
+    usage = request_usage.get()
+    if usage is not None:
+        usage[2] += elapsed
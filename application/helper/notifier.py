@@ -0,0 +1,41 @@
+from application import outbox, tasks
+from application.setting import settings
+
+TELEGRAM_MESSAGE_LIMIT = 4096
+DIGEST_SEPARATOR = "\n\n➖➖➖➖➖\n\n"
+
+
+def split_message(text: str, limit: int = TELEGRAM_MESSAGE_LIMIT):
+    """Split ``text`` into chunks of at most ``limit`` chars, preferring line breaks."""
+    chunks = []
+    while len(text) > limit:
+        cut = text.rfind("\n", 0, limit)
+        if cut <= 0:
+            cut = limit
+        chunks.append(text[:cut])
+        text = text[cut:].lstrip("\n")
+    if text:
+        chunks.append(text)
+    return chunks
+
+
+def build_digest(messages):
+    if len(messages) == 1:
+        return messages[0]
+    return f"🧾 {len(messages)} notifications\n\n" + DIGEST_SEPARATOR.join(messages)
+
+
+def is_urgent(message_thread_id) -> bool:
+    return message_thread_id == settings.ERR_THREAD_ID or message_thread_id in settings.DIGEST_BYPASS_THREAD_IDS
+
+
+def notify(db, msg: str, message_thread_id: int = settings.ERR_THREAD_ID):
+    """Queue a Telegram notification in ``db``'s transaction through the outbox.
+
+    Non-urgent threads get a coalesce key, so the relay folds them into
+    digests of up to DIGEST_MAX_MESSAGES sent every DIGEST_WINDOW_SECONDS.
+    """
+    coalesce_key = None
+    if settings.DIGEST_ENABLED and not is_urgent(message_thread_id):
+        coalesce_key = f"digest:{message_thread_id}"
+    outbox.enqueue(db, tasks.report_to_admin_api, msg, message_thread_id=message_thread_id, coalesce_key=coalesce_key)
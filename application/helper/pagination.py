@@ -0,0 +1,20 @@
+import base64
+import json
+from datetime import datetime
+from fastapi import HTTPException
+from application.helper.time_helpers import naive_utc
+
+
+def encode_cursor(visit_timestamp: datetime, visit_id: int) -> str:
+    raw = json.dumps([visit_timestamp.isoformat(), visit_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """Inverse of ``encode_cursor``; returns ``(visit_timestamp, visit_id)``."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, visit_id = json.loads(base64.urlsafe_b64decode(padded))
+        return naive_utc(datetime.fromisoformat(timestamp)), int(visit_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
@@ -0,0 +1,105 @@
+import bisect
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class PoolMetrics:
+    """Counters for one connection pool, updated from pool events and checkout timing."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pool = None
+        self._lock = threading.Lock()
+        self.connections_created = 0
+        self.connections_invalidated = 0
+        self.checkouts = 0
+        self.checkout_timeouts = 0
+        self.wait_seconds_sum = 0.0
+        self.wait_bucket_counts = [0] * (len(WAIT_BUCKETS) + 1)
+
+    def observe_wait(self, seconds: float, timed_out: bool = False):
+        index = bisect.bisect_left(WAIT_BUCKETS, seconds)
+        with self._lock:
+            self.wait_bucket_counts[index] += 1
+            self.wait_seconds_sum += seconds
+            if timed_out:
+                self.checkout_timeouts += 1
+            else:
+                self.checkouts += 1
+
+    def incr(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            buckets = {}
+            cumulative = 0
+            for bound, count in zip(WAIT_BUCKETS + ("+Inf",), self.wait_bucket_counts):
+                cumulative += count
+                buckets[str(bound)] = cumulative
+            data = {
+                "connections_created": self.connections_created,
+                "connections_invalidated": self.connections_invalidated,
+                "checkouts": self.checkouts,
+                "checkout_timeouts": self.checkout_timeouts,
+                "checkout_wait_seconds": {
+                    "buckets": buckets,
+                    "sum": self.wait_seconds_sum,
+                    "count": cumulative,
+                },
+            }
+
+        pool = self.pool
+        if pool is not None:
+            data.update({
+                "pool_size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow_in_use": max(pool.overflow(), 0),
+            })
+        return data
+
+
+def instrumented_pool_class(pool_class, metrics: PoolMetrics):
+    """Subclass ``pool_class`` so every checkout is timed into ``metrics``.
+
+    The metrics object lives on the class, so it survives ``Pool.recreate()``.
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = pool_class._do_get(self)
+        except PoolTimeoutError:
+            self.metrics.observe_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.observe_wait(time.perf_counter() - start)
+        return connection
+
+    return type(f"Instrumented{pool_class.__name__}", (pool_class,), {"metrics": metrics, "_do_get": _do_get})
+
+
+def watch_engine(engine, metrics: PoolMetrics):
+    """Attach connection lifecycle listeners; pass ``async_engine.sync_engine`` for async engines."""
+    metrics.pool = engine.pool
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        metrics.incr("connections_created")
+
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.incr("connections_invalidated")
+
+    @event.listens_for(engine, "soft_invalidate")
+    def on_soft_invalidate(dbapi_connection, connection_record, exception):
+        metrics.incr("connections_invalidated")
+
+    @event.listens_for(engine, "engine_disposed")
+    def on_disposed(disposed_engine):
+        metrics.pool = disposed_engine.pool
@@ -0,0 +1,145 @@
+import asyncio
+from redis.exceptions import RedisError
+from application.helper.cache import TTLCache
+from application.helper.redis_client import get_redis, create_subscriber
+from application.logger_config import logger
+from application.setting import settings
+
+FILE_NAME = "helper:principal_cache"
+
+# Marks a cached "no such user / not an admin" so negative lookups are cached too.
+MISSING = "null"
+
+INVALIDATION_CHANNEL = "principal:invalidate"
+RESUBSCRIBE_DELAY = 1
+
+# Stores the loaded principal only if the key's generation is still the one
+# read before the database load, i.e. no invalidation happened in between.
+SET_IF_GENERATION = """
+if (redis.call('get', KEYS[2]) or '0') == ARGV[1] then
+    redis.call('set', KEYS[1], ARGV[2], 'EX', ARGV[3])
+    return 1
+end
+return 0
+"""
+
+_local = TTLCache(settings.PRINCIPAL_CACHE_SIZE, settings.PRINCIPAL_CACHE_TTL)
+_local_generation = 0  # bumped on every invalidation this worker sees
+_subscribed = False
+
+
+def local_tier_enabled() -> bool:
+    """Whether this worker may serve principals from process memory.
+
+    Only when it cannot miss an invalidation: it is the only API worker, or it
+    is currently subscribed to the invalidations other workers publish.
+    """
+    return settings.WEB_WORKERS <= 1 or _subscribed
+
+
+def _key(kind: str, key) -> str:
+    return f"principal:{kind}:{key}"
+
+
+def _generation_key(cache_key: str) -> str:
+    return f"{cache_key}:generation"
+
+
+def _drop_local(cache_key: str):
+    global _local_generation
+    _local_generation += 1
+    _local.pop(cache_key)
+
+
+async def get(kind: str, key, schema, load):
+    """Return a cached principal, falling back to Redis and then to ``load()``.
+
+    ``load`` is an async callable returning an ORM object or None; the result
+    is stored as ``schema`` in both tiers. The local tier is skipped while
+    ``local_tier_enabled()`` is false, so a removed admin loses access on every
+    worker as soon as the change commits.
+
+    A value loaded from the database is only cached if no invalidation of it
+    happened while it was loading (generation counters in Redis and in this
+    process), so a load that raced a commit cannot put the old value back.
+    """
+    cache_key = _key(kind, key)
+    use_local = local_tier_enabled()
+    cached = _local.get(cache_key) if use_local else None
+    if cached is not None:
+        return None if cached == MISSING else cached
+
+    local_generation = _local_generation
+    redis = get_redis()
+    generation = None
+    if redis is not None:
+        try:
+            raw, generation = await redis.mget(cache_key, _generation_key(cache_key))
+        except RedisError as e:
+            logger.warning(f"{FILE_NAME}:get", extra={"error": str(e)})
+            raw = None
+        if raw is not None:
+            value = MISSING if raw.decode() == MISSING else schema.model_validate_json(raw)
+            if use_local and local_generation == _local_generation:
+                _local.set(cache_key, value)
+            return None if value == MISSING else value
+
+    record = await load()
+    value = schema.model_validate(record) if record is not None else MISSING
+    if use_local and local_generation == _local_generation:
+        _local.set(cache_key, value)
+    if redis is not None:
+        raw = MISSING if value == MISSING else value.model_dump_json()
+        try:
+            await redis.eval(
+                SET_IF_GENERATION, 2, cache_key, _generation_key(cache_key),
+                (generation or b"0").decode(), raw, settings.PRINCIPAL_CACHE_REDIS_TTL
+            )
+        except RedisError as e:
+            logger.warning(f"{FILE_NAME}:set", extra={"error": str(e)})
+    return None if value == MISSING else value
+
+
+async def invalidate(kind: str, key):
+    """Call after the change commits: bumps the generation, drops both tiers and tells the other workers."""
+    cache_key = _key(kind, key)
+    _drop_local(cache_key)
+    redis = get_redis()
+    if redis is not None:
+        try:
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.incr(_generation_key(cache_key))
+                # Outlives any load that read the old generation; a lost counter reads as "0" again.
+                pipe.expire(_generation_key(cache_key), settings.PRINCIPAL_CACHE_REDIS_TTL)
+                pipe.delete(cache_key)
+                pipe.publish(INVALIDATION_CHANNEL, cache_key)
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning(f"{FILE_NAME}:invalidate", extra={"error": str(e)})
+
+
+async def listen_for_invalidations():
+    """Background loop started from the app lifespan; drops local entries invalidated by other workers.
+
+    While unsubscribed the local tier is off, and it is emptied on every
+    (re)subscribe because messages published in between are lost.
+    """
+    global _subscribed
+    if not settings.REDIS_URL:
+        return
+    while True:
+        client = create_subscriber()
+        try:
+            async with client.pubsub() as pubsub:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                _local.clear()
+                _subscribed = True
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        _drop_local(message["data"].decode())
+        except (RedisError, OSError) as e:
+            logger.warning(f"{FILE_NAME}:listen_for_invalidations", extra={"error": str(e)})
+        finally:
+            _subscribed = False
+            await client.aclose()
+        await asyncio.sleep(RESUBSCRIBE_DELAY)
@@ -0,0 +1,102 @@
+import math
+import time
+from fastapi import HTTPException
+from redis.exceptions import RedisError
+from application.helper import metrics
+from application.helper.cache import TTLCache
+from application.helper.redis_client import get_redis
+from application.logger_config import logger
+from application.setting import settings
+
+FILE_NAME = "helper:rate_limit"
+
+
+class SlidingWindowLimit:
+    """At most ``limit`` hits per ``window`` seconds for each key.
+
+    Uses the sliding window counter approximation: hits are counted in fixed
+    windows and the previous window's count is weighted by how much of it the
+    sliding window still overlaps. Counters live in Redis when ``REDIS_URL`` is
+    set, so every API worker shares them; otherwise, or while Redis is
+    unreachable, they are kept per process. Rejected hits count too, so a
+    client that keeps hammering stays blocked.
+    """
+
+    def __init__(self, name: str, limit: int, window: int):
+        self.name = name
+        self.limit = limit
+        self.window = window
+        self._local = TTLCache(settings.RATE_LIMIT_CACHE_SIZE, 2 * window)
+
+    def _hit_local(self, key, index: int, cost: int):
+        state = self._local.get(key)
+        if state is None or state[0] < index - 1:
+            current, previous = 0, 0
+        elif state[0] == index - 1:
+            current, previous = 0, state[1]
+        else:
+            _, current, previous = state
+        current += cost
+        self._local.set(key, (index, current, previous))
+        return current, previous
+
+    async def _hit_redis(self, redis, key, index: int, cost: int):
+        current_key = f"ratelimit:{self.name}:{key}:{index}"
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.incrby(current_key, cost)
+            pipe.expire(current_key, 2 * self.window)
+            pipe.get(f"ratelimit:{self.name}:{key}:{index - 1}")
+            current, _, previous = await pipe.execute()
+        return current, int(previous or 0)
+
+    def retry_after(self, current: int, previous: int, elapsed: float) -> float:
+        """Seconds until the weighted count drops below the limit again; 0 while within it."""
+        if current + previous * (1 - elapsed / self.window) <= self.limit:
+            return 0
+        if current < self.limit:
+            return self.window * (1 - (self.limit - current) / previous) - elapsed
+        return self.window - elapsed + self.window * (1 - self.limit / current)
+
+    async def hit(self, key, cost: int = 1) -> float:
+        """Record ``cost`` hits for ``key``; returns 0 if allowed, else the seconds to wait."""
+        index, elapsed = divmod(time.time(), self.window)
+        index = int(index)
+        redis = get_redis()
+        counts = None
+        if redis is not None:
+            try:
+                counts = await self._hit_redis(redis, key, index, cost)
+            except RedisError as e:
+                logger.warning(f"{FILE_NAME}:hit", extra={"limit": self.name, "error": str(e)})
+        if counts is None:
+            counts = self._hit_local(key, index, cost)
+        return self.retry_after(*counts, elapsed)
+
+    async def reset(self, key):
+        self._local.pop(key)
+        redis = get_redis()
+        if redis is not None:
+            index = int(time.time() // self.window)
+            try:
+                await redis.delete(f"ratelimit:{self.name}:{key}:{index}", f"ratelimit:{self.name}:{key}:{index - 1}")
+            except RedisError as e:
+                logger.warning(f"{FILE_NAME}:reset", extra={"limit": self.name, "error": str(e)})
+
+
+async def enforce(limit: SlidingWindowLimit, key, cost: int = 1):
+    """Raise 429 with Retry-After once ``key`` is over ``limit``; call before the expensive part of a handler."""
+    if not settings.RATE_LIMIT_ENABLED or key is None:
+        return
+    retry_after = await limit.hit(key, cost)
+    if retry_after:
+        metrics.rate_limited.inc((limit.name,))
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests, try again later",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+
+
+LOGIN_BY_IP = SlidingWindowLimit("login_ip", *settings.LOGIN_RATE_LIMIT_PER_IP)
+LOGIN_BY_PHONE = SlidingWindowLimit("login_phone", *settings.LOGIN_RATE_LIMIT_PER_PHONE)
+UPLOAD_BY_USER = SlidingWindowLimit("upload_user", *settings.UPLOAD_RATE_LIMIT_PER_USER)
@@ -0,0 +1,17 @@
+from functools import lru_cache
+from application.setting import settings
+
+
+@lru_cache(maxsize=1)
+def get_redis():
+    """Shared asyncio Redis client, or None when ``REDIS_URL`` is not configured."""
+    if not settings.REDIS_URL:
+        return None
+    import redis.asyncio as redis
+    return redis.Redis.from_url(settings.REDIS_URL, socket_timeout=settings.REDIS_SOCKET_TIMEOUT)
+
+
+def create_subscriber():
+    """Dedicated client for a long-lived pub/sub subscription; reads block without the request socket timeout."""
+    import redis.asyncio as redis
+    return redis.Redis.from_url(settings.REDIS_URL, health_check_interval=30)
@@ -0,0 +1,96 @@
+import hashlib
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
+from application.setting import settings
+from application import storage
+
+
+def read_blob(blob_hash: str) -> bytes:
+    with storage.get_storage().open(blob_hash) as blob:
+        return blob.read()
+
+
+def make_etag(blob_hash: str) -> str:
+    return f'"{blob_hash}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
+
+
+def parse_range(range_header: str, size: int):
+    """Parse a single ``bytes=`` range into ``(start, end)`` with ``end`` exclusive.
+
+    Returns None for multi-range or malformed headers, in which case the full
+    body is sent, as RFC 9110 allows.
+    """
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = int(last) + 1 if last else size
+        else:
+            start = max(size - int(last), 0)
+            end = size
+    except ValueError:
+        return None
+
+    end = min(end, size)
+    if start >= size or start >= end:
+        raise HTTPException(status_code=416, detail="Requested range not satisfiable",
+                            headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+
+async def blob_response(request: Request, blob_hash: str, content_type: str, filename: str, load_legacy_bytes):
+    """Serve a stored voice file with ETag, conditional GET and Range support.
+
+    Files on local disk go through ``FileResponse`` (range handling and
+    sendfile-style transfer). Rows without a ``blob_hash`` predate blob storage
+    and are read with ``load_legacy_bytes``.
+    """
+    headers = {
+        "Cache-Control": f"private, max-age={settings.VOICE_CACHE_MAX_AGE}",
+        "Content-Disposition": f"attachment; filename={filename}",
+    }
+
+    file_bytes = None
+    if blob_hash is None:
+        file_bytes = await load_legacy_bytes()
+        blob_hash = hashlib.sha256(file_bytes).hexdigest()
+
+    etag = make_etag(blob_hash)
+    headers["ETag"] = etag
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    path = storage.get_storage().local_path(blob_hash) if file_bytes is None else None
+    if path:
+        return FileResponse(path, media_type=content_type, headers=headers)
+
+    if file_bytes is None:
+        file_bytes = await run_in_threadpool(read_blob, blob_hash)
+
+    headers["Accept-Ranges"] = "bytes"
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    byte_range = None
+    if range_header and (if_range is None or if_range == etag):
+        byte_range = parse_range(range_header, len(file_bytes))
+
+    if byte_range is None:
+        return Response(content=file_bytes, media_type=content_type, headers=headers)
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end - 1}/{len(file_bytes)}"
+    return Response(content=file_bytes[start:end], status_code=206, media_type=content_type, headers=headers)
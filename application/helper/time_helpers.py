@@ -0,0 +1,14 @@
+from datetime import datetime
+from pytz import UTC
+
+
+def utc_now() -> datetime:
+    """Current time as naive UTC, the form every ``DateTime`` column stores."""
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+def naive_utc(value: datetime) -> datetime:
+    """``value`` as naive UTC so it can be compared with the naive columns; naive input is taken as UTC."""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(UTC).replace(tzinfo=None)
@@ -1,8 +1,16 @@
 import datetime
 import logging
+from application.helper.cache import TTLCache
 
 logging.getLogger("application")
 bakery_token = {}
 
 def get_expiry(minutes=10):
     return datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(minutes=minutes)
+
+
+class VerifiedTokenCache(TTLCache):
+    """Access tokens that already passed ``jwt.decode``, dropped at their ``exp`` at the latest."""
+
+    def put(self, token: str, payload: dict):
+        self.set(token, payload, expires_at=payload.get("exp"))
@@ -1,8 +1,7 @@
 from application.database import Base
-from sqlalchemy import Integer, String, Column, Boolean, ForeignKey, DateTime, LargeBinary, Float, Text
-from datetime import datetime
-from pytz import UTC
-from sqlalchemy.orm import relationship
+from sqlalchemy import Integer, BigInteger, String, Column, Boolean, ForeignKey, DateTime, Date, LargeBinary, Float, Text, Index, JSON
+from application.helper.time_helpers import utc_now
+from sqlalchemy.orm import relationship, deferred
 
 
 class User(Base):
@@ -15,7 +14,7 @@ class User(Base):
     last_name = Column(String)
     hashed_password = Column(String)
     active = Column(Boolean, default=True)
-    register_date = Column(DateTime, default=lambda: datetime.now(UTC))
+    register_date = Column(DateTime, default=utc_now)
 
     admin_associations = relationship("Admin", back_populates="user", cascade="all, delete-orphan")
     visit_associations = relationship("VisitData", back_populates="user", cascade="all, delete-orphan")
@@ -26,7 +25,7 @@ class Admin(Base):
     user_id = Column(Integer, ForeignKey('user_detail.user_id', ondelete='CASCADE'), unique=True)
     active = Column(Boolean, default=True)
     user = relationship("User", back_populates="admin_associations")
-    register_date = Column(DateTime, default=lambda: datetime.now(UTC))
+    register_date = Column(DateTime, default=utc_now)
 
 class VisitData(Base):
     __tablename__ = "visit_data"
@@ -35,7 +34,14 @@ class VisitData(Base):
     user_id = Column(Integer, ForeignKey("user_detail.user_id"))
     hs_unique_code = Column(String, nullable=False)
     filename = Column(String, nullable=False)
-    file_data = Column(LargeBinary, nullable=False)
+    file_data = deferred(Column(LargeBinary, nullable=True))  # legacy inline audio, moved out by the blob backfill
+    file_hash = Column(String(64), nullable=True, index=True)
+    file_size = Column(BigInteger, nullable=True)
+    telegram_file_id = Column(String, nullable=True)
+    # Normalised Opus copy served by default; equals the original when no codec was available.
+    compact_file_hash = Column(String(64), nullable=True)
+    compact_file_size = Column(BigInteger, nullable=True)
+    compact_content_type = Column(String, nullable=True)
     content_type = Column(String, nullable=False)
     place_name = Column(String, nullable=False)
     person_name = Column(String, nullable=False)
@@ -43,6 +49,56 @@ class VisitData(Base):
     person_position = Column(String, nullable=True)
     latitude = Column(Float, nullable=True)
     longitude = Column(Float, nullable=True)
-    visit_timestamp = Column(DateTime, default=lambda: datetime.now(UTC))
+    geohash = Column(String(12), nullable=True)
+    visit_timestamp = Column(DateTime, nullable=False, default=utc_now)
     description = Column(Text, nullable=True)
-    user = relationship("User", back_populates="visit_associations")
\ No newline at end of file
+    # Normalised place/person/address/description text backing GET /visit/search.
+    search_text = Column(Text, nullable=True)
+    user = relationship("User", back_populates="visit_associations")
+
+    # Composite indexes matching the keyset pagination order of GET /visit.
+    __table_args__ = (
+        Index("ix_visit_data_timestamp_id", "visit_timestamp", "id"),
+        Index("ix_visit_data_user_timestamp_id", "user_id", "visit_timestamp", "id"),
+        Index("ix_visit_data_hs_code_timestamp_id", "hs_unique_code", "visit_timestamp", "id"),
+        # pattern_ops lets Postgres answer "geohash LIKE 'prefix%'" from the index.
+        Index("ix_visit_data_geohash", "geohash", postgresql_ops={"geohash": "varchar_pattern_ops"}),
+        Index(
+            "ix_visit_data_search_text_trgm", "search_text",
+            postgresql_using="gin", postgresql_ops={"search_text": "gin_trgm_ops"}
+        ),
+    )
+
+
+class VisitStatsDay(Base):
+    """Visits per business day; kept in step with visit_data on insert."""
+    __tablename__ = "visit_stats_day"
+
+    day = Column(Date, primary_key=True)
+    visit_count = Column(Integer, nullable=False, default=0)
+
+
+class VisitStatsUserDay(Base):
+    """Visits per business day and rep; kept in step with visit_data on insert."""
+    __tablename__ = "visit_stats_user_day"
+
+    day = Column(Date, primary_key=True)
+    user_id = Column(Integer, ForeignKey("user_detail.user_id", ondelete="CASCADE"), primary_key=True)
+    visit_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_visit_stats_user_day_user_day", "user_id", "day"),
+    )
+
+
+class OutboxMessage(Base):
+    """Celery task call committed with the rows it describes; published by the outbox relay."""
+    __tablename__ = "outbox"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    task = Column(String, nullable=False)
+    args = Column(JSON, nullable=False)
+    kwargs = Column(JSON, nullable=False)
+    # Messages sharing a key are merged into one Telegram digest by the relay.
+    coalesce_key = Column(String, nullable=True)
+    created_at = Column(DateTime, default=utc_now)
@@ -0,0 +1,90 @@
+import time
+from collections import defaultdict
+from datetime import timedelta
+from sqlalchemy.orm import Session
+from application import models
+from application.database import SessionLocal
+from application.helper import notifier
+from application.helper.time_helpers import utc_now
+from application.logger_config import celery_logger as logger
+from application.setting import settings
+
+
+def enqueue(db, task, *args, coalesce_key: str = None, **kwargs):
+    """Stage ``task.delay(*args, **kwargs)`` in ``db``; it is published only if the transaction commits.
+
+    Works with both sync and async sessions, since it only adds a row.
+    """
+    db.add(models.OutboxMessage(task=task.name, args=list(args), kwargs=kwargs, coalesce_key=coalesce_key))
+
+
+def publish(task_name: str, args, kwargs):
+    from application.tasks import celery_app
+    celery_app.tasks[task_name].apply_async(args=args, kwargs=kwargs)
+
+
+def publish_digest(messages):
+    """Publish a coalesced group as ``report_to_admin_api`` calls of at most 4096 chars each."""
+    thread_id = messages[0].kwargs.get("message_thread_id")
+    text = notifier.build_digest([message.args[0] for message in messages])
+    for chunk in notifier.split_message(text):
+        publish(messages[0].task, [chunk], {"message_thread_id": thread_id})
+
+
+def relay_batch(db: Session, batch_size: int) -> int:
+    """Publish and delete up to ``batch_size`` of the oldest messages; returns how many were sent.
+
+    Rows are locked with SKIP LOCKED, so several relays can run side by side.
+    Coalesced groups wait until DIGEST_MAX_MESSAGES pile up or the oldest is
+    DIGEST_WINDOW_SECONDS old. A crash between publish and commit re-sends
+    the batch, so delivery is at least once.
+    """
+    messages = (
+        db.query(models.OutboxMessage)
+        .order_by(models.OutboxMessage.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    groups = defaultdict(list)
+    sent = []
+    for message in messages:
+        if message.coalesce_key:
+            groups[message.coalesce_key].append(message)
+        else:
+            publish(message.task, message.args, message.kwargs)
+            sent.append(message)
+
+    window_start = utc_now() - timedelta(seconds=settings.DIGEST_WINDOW_SECONDS)
+    for group in groups.values():
+        oldest = group[0].created_at
+        if len(group) >= settings.DIGEST_MAX_MESSAGES or oldest <= window_start:
+            publish_digest(group)
+            sent.extend(group)
+
+    if sent:
+        db.query(models.OutboxMessage).filter(
+            models.OutboxMessage.id.in_([message.id for message in sent])
+        ).delete(synchronize_session=False)
+    db.commit()
+    return len(sent)
+
+
+def run_relay(batch_size: int, poll_interval: float):
+    """Drain the outbox forever; a full batch is followed immediately by the next one."""
+    while True:
+        db = SessionLocal()
+        try:
+            sent = relay_batch(db, batch_size)
+        except Exception as e:
+            db.rollback()
+            logger.error("outbox:relay_batch", extra={"error": str(e)})
+            sent = 0
+            time.sleep(settings.OUTBOX_ERROR_BACKOFF)
+        finally:
+            db.close()
+
+        if sent:
+            logger.info("outbox:relay_batch", extra={"sent": sent})
+        if sent < batch_size:
+            time.sleep(poll_interval)
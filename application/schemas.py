@@ -1,4 +1,6 @@
-from pydantic import BaseModel
+from datetime import date, datetime
+from typing import Optional
+from pydantic import BaseModel, Field
 
 class SignUpRequirement(BaseModel):
     phone_number: str
@@ -25,8 +27,79 @@ class LogInRequirement(BaseModel):
 class NewAdminRequirement(UserID):
     status: bool = True
 
+class UserPrincipal(BaseModel):
+    user_id: int
+    first_name: str | None = None
+    last_name: str | None = None
+    email: str | None = None
+    phone_number: str | None = None
+
+    class Config:
+        from_attributes = True
+
+class AdminPrincipal(BaseModel):
+    admin_id: int
+    user_id: int
+    active: bool
+
+    class Config:
+        from_attributes = True
+
 class NewAdminResult(BaseModel):
     admin_id: int
 
     class Config:
         from_attributes = True
+
+class VisitSummary(BaseModel):
+    id: int
+    user_id: Optional[int]
+    hs_unique_code: str
+    filename: str
+    content_type: str
+    file_size: Optional[int]
+    place_name: str
+    person_name: str
+    address: str
+    person_position: Optional[str]
+    latitude: Optional[float]
+    longitude: Optional[float]
+    visit_timestamp: Optional[datetime]
+    description: Optional[str]
+
+    class Config:
+        from_attributes = True
+
+class VisitUploadItem(BaseModel):
+    client_ref: Optional[str] = None  # echoed back so the device can match results to its queue
+    hs_unique_code: str
+    place_name: str
+    person_name: str
+    address: str
+    person_position: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    description: Optional[str] = None
+
+class UploadSessionCreate(VisitUploadItem):
+    filename: str
+    content_type: str
+    total_size: int = Field(..., gt=0)
+
+class UploadSessionStatus(BaseModel):
+    upload_id: str
+    offset: int
+    total_size: int
+    expires_at: datetime
+
+class VisitStatsBucket(BaseModel):
+    period: date  # first day of the day/week/month bucket
+    user_id: Optional[int] = None
+    visit_count: int
+
+class VisitPage(BaseModel):
+    items: list[VisitSummary]
+    next_cursor: Optional[str] = None
+
+class NearbyVisit(VisitSummary):
+    distance_km: float
@@ -0,0 +1,35 @@
+"""Production entry point: ``python -m application.serve``.
+
+Runs ``WEB_WORKERS`` uvicorn worker processes (one per CPU by default) on a
+shared socket. This supervisor only loads settings; each worker imports the
+app itself, so the database engines, Celery producer pool and password
+hashing pool are created inside the worker, and ``/health/ready`` stays 503
+until that worker has warmed up.
+
+Everything held in process memory is per worker: ``/metrics`` answers for
+whichever worker takes the scrape, and the token and principal caches are
+not shared. With more than one worker the principal cache only keeps its
+local tier while subscribed to Redis invalidations, so set ``REDIS_URL``.
+Database pool settings apply per worker too, so budget ``WEB_WORKERS *
+(DB_POOL_SIZE + DB_MAX_OVERFLOW)`` connections.
+"""
+import os
+import uvicorn
+from application.setting import settings
+
+
+def main():
+    workers = settings.WEB_WORKERS or os.cpu_count() or 1
+    # Workers read the resolved count, e.g. to know whether process-local caches can go stale.
+    os.environ["WEB_WORKERS"] = str(workers)
+    uvicorn.run(
+        "application.server_side:app",
+        host=settings.WEB_HOST,
+        port=settings.WEB_PORT,
+        workers=workers,
+        timeout_graceful_shutdown=settings.WEB_GRACEFUL_TIMEOUT,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,47 @@
 from fastapi import FastAPI, Request, HTTPException,Depends
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
+import hmac
+import time
 import jwt
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from application.logger_config import fastapi_listener
-from application.auth import create_access_token, set_cookie
+from application.auth import issue_access_token, set_cookie
 from application.setting import settings
+from application.database import sync_pool_metrics, async_pool_metrics
 from application.user import authentication, visit
 from application.admin import manage, init
-from contextlib import asynccontextmanager
-from application.helper import endpoint_helper
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from application.helper import endpoint_helper, metrics, principal_cache
+from application.helper.request_limits import BodySizeLimitMiddleware
+from application.helper.token_helpers import VerifiedTokenCache
 from fastapi.middleware.cors import CORSMiddleware
-from application import tasks, crud
+from application import tasks, async_crud, hashers, upload_sessions, outbox, health
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     fastapi_listener.start()
+    upload_gc = asyncio.create_task(upload_sessions.run_garbage_collector())
+    principal_listener = asyncio.create_task(principal_cache.listen_for_invalidations())
+    await health.warm_up(app)
+    health.mark_ready()
     yield
+    health.mark_ready(False)
+    for task in (upload_gc, principal_listener):
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    hashers.shutdown_executor()
     fastapi_listener.stop()
 
 app = FastAPI(lifespan=lifespan)
 
+# Innermost, so auth rejects anonymous uploads first and CORS headers still reach 413 responses.
+app.add_middleware(BodySizeLimitMiddleware, limits={
+    "/visit/upload": settings.MAX_UPLOAD_SIZE + settings.MAX_UPLOAD_FORM_OVERHEAD,
+    "/visit/upload_batch": settings.MAX_BATCH_UPLOAD_ITEMS * (settings.MAX_UPLOAD_SIZE + settings.MAX_UPLOAD_FORM_OVERHEAD),
+})
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://telavang.freebyte.shop", "https://telavang.freebyte.shop", "https://telavang.freebyte.shop:8443"],
@@ -35,15 +57,22 @@ app.include_router(authentication.router)
 app.include_router(manage.router)
 app.include_router(init.router)
 app.include_router(visit.router)
+app.include_router(health.router)
+
+AUTH_EXEMPT_PATHS = ("/auth/logout-successful", "/auth/login", "/docs", "/auth/logout", "/admin/init", "/telegram_callback")
+AUTH_EXEMPT_EXACT_PATHS = {"/health/live", "/health/ready"}
+access_token_cache = VerifiedTokenCache(settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_TTL)
 
 @app.middleware("http")
 async def authenticate_request(request: Request, call_next):
     if request.method == "OPTIONS":
         return await call_next(request)
 
-    exception_paths = ["/auth/logout-successful", "/auth/login", "/docs", "/auth/logout", "/admin/init", "/telegram_callback"]
+    if request.url.path.startswith(AUTH_EXEMPT_PATHS) or request.url.path in AUTH_EXEMPT_EXACT_PATHS:
+        return await call_next(request)
 
-    if any(request.url.path.startswith(path) for path in exception_paths):
+    if request.url.path == "/metrics" and settings.METRICS_TOKEN:
+        # Scrapers present the bearer token instead of a session cookie.
         return await call_next(request)
 
     request.state.user = None
@@ -51,8 +80,13 @@ async def authenticate_request(request: Request, call_next):
     refresh_token = request.cookies.get("refresh_token")
 
     if access_token:
+        payload = access_token_cache.get(access_token)
+        if payload is not None:
+            request.state.user = payload
+            return await call_next(request)
         try:
             payload = jwt.decode(access_token, settings.ACCESS_TOKEN_SECRET_KEY, algorithms=settings.ALGORITHM)
+            access_token_cache.put(access_token, payload)
             request.state.user = payload
             return await call_next(request)
         except jwt.ExpiredSignatureError:
@@ -63,12 +97,13 @@ async def authenticate_request(request: Request, call_next):
     if refresh_token:
         try:
             refresh_payload = jwt.decode(refresh_token, settings.REFRESH_TOKEN_SECRET_KEY, algorithms=settings.ALGORITHM)
-            new_token = create_access_token({
+            new_token, new_payload = issue_access_token({
                 "user_id": refresh_payload["user_id"],
                 "first_name": refresh_payload["first_name"]
             })
 
-            request.state.user = jwt.decode(new_token, settings.ACCESS_TOKEN_SECRET_KEY, algorithms=["HS256"])
+            access_token_cache.put(new_token, new_payload)
+            request.state.user = new_payload
             response = await call_next(request)
             set_cookie(response, "access_token", new_token, settings.ACCESS_TOKEN_EXP_MIN * 60)
             return response
@@ -78,18 +113,57 @@ async def authenticate_request(request: Request, call_next):
     return JSONResponse(status_code=401, content={"detail": "Unauthorized: No token found"})
 
 
+@app.middleware("http")
+async def record_metrics(request: Request, call_next):
+    usage = [0, 0.0, 0.0]
+    metrics.request_usage.set(usage)
+    metrics.http_in_flight.inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.http_in_flight.dec()
+        route = request.scope.get("route")
+        labels = (request.method, route.path if route else "unmatched")
+        metrics.http_requests.inc(labels + (str(status),))
+        metrics.http_latency.observe(elapsed, labels)
+        metrics.http_db_queries.observe(usage[0], labels)
+        metrics.http_db_time.observe(usage[1], labels)
+        metrics.http_publish_time.observe(usage[2], labels)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(request: Request, db: AsyncSession = Depends(endpoint_helper.get_async_db)):
+    """Needs the METRICS_TOKEN bearer token when one is set, otherwise an admin session."""
+    if settings.METRICS_TOKEN:
+        expected = f"Bearer {settings.METRICS_TOKEN}"
+        if not hmac.compare_digest(request.headers.get("authorization", ""), expected):
+            raise HTTPException(status_code=401, detail="Unauthorized")
+    else:
+        await manage.require_admin(request, db)
+    body = metrics.render({"async": async_pool_metrics, "sync": sync_pool_metrics})
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+
 @app.post("/telegram_callback")
-async def telegram_callback(callback_data: str, db: Session = Depends(endpoint_helper.get_db)):
+async def telegram_callback(callback_data: str, db: AsyncSession = Depends(endpoint_helper.get_async_db)):
     action, visit_id_str = callback_data.split(":")
     visit_id = int(visit_id_str)
     if action == 'receive_telegram':
-        visit_record = crud.get_visit_by_visit_id(db, visit_id)
+        visit_record = await async_crud.get_visit_brief(db, visit_id)
         if visit_record:
-            tasks.report_to_admin_api.delay(
+            outbox.enqueue(
+                db, tasks.report_to_admin_api,
                 msg=f"Voice file for {visit_record.place_name}",
                 message_thread_id=settings.VISITS_THREAD_ID,
                 reply_markup=None
             )
+            outbox.enqueue(db, tasks.send_voice_to_telegram, visit_id)
+            await db.commit()
         else:
             raise HTTPException(status_code=404, detail="Visit record not found")
     else:
@@ -1,8 +1,17 @@
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str
+    ASYNC_DATABASE_URL: Optional[str] = None  # derived from DATABASE_URL when unset
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    WORKER_DB_POOL_SIZE: int = 4  # sync engine used by Celery tasks and CLI commands
+    WORKER_DB_MAX_OVERFLOW: int = 2
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
     PUBLIC_URL: str
 
     # Auth
@@ -11,6 +20,17 @@ class Settings(BaseSettings):
     ALGORITHM: str
     ACCESS_TOKEN_EXP_MIN: int
     REFRESH_TOKEN_EXP_MIN: int
+    TOKEN_CACHE_SIZE: int = 10000
+    TOKEN_CACHE_TTL: float = 300
+
+    # Password hashing
+    PASSWORD_HASHER: str = "pbkdf2_sha256"
+    PASSWORD_HASH_POOL: str = "thread"  # "thread" or "process"
+    PASSWORD_HASH_WORKERS: int = 4
+    PBKDF2_ITERATIONS: int = 600000
+    SCRYPT_N: int = 2 ** 14
+    SCRYPT_R: int = 8
+    SCRYPT_P: int = 1
 
     # Telegram
     TELEGRAM_TOKEN: str
@@ -19,10 +39,91 @@ class Settings(BaseSettings):
     NEW_USER_THREAD_ID: int
     INFO_THREAD_ID: int
     VISITS_THREAD_ID: int
+    TELEGRAM_API_URL: str = "https://api.telegram.org"
+    TELEGRAM_TIMEOUT: float = 10
+    TELEGRAM_UPLOAD_TIMEOUT: float = 30
+    TELEGRAM_MAX_CONNECTIONS: int = 8
+    TELEGRAM_RATE_PER_SECOND: float = 20 / 60  # Telegram allows ~20 messages a minute per group
+    TELEGRAM_RATE_BURST: float = 20
+    TELEGRAM_MAX_LIMITER_WAIT: float = 2  # longer waits are handed back to Celery as a retry
+    TELEGRAM_RATE_LIMIT_RETRIES: int = 10
+
+    # Notification digests, coalesced by the outbox relay (ERR_THREAD_ID always bypasses)
+    DIGEST_ENABLED: bool = True
+    DIGEST_WINDOW_SECONDS: float = 30
+    DIGEST_MAX_MESSAGES: int = 50
+    DIGEST_BYPASS_THREAD_IDS: list[int] = []
+
+    # Transactional outbox relay
+    OUTBOX_BATCH_SIZE: int = 200
+    OUTBOX_POLL_INTERVAL: float = 0.5
+    OUTBOX_ERROR_BACKOFF: float = 5
+
+    # Web server (python -m application.serve); DB_POOL_SIZE and DB_MAX_OVERFLOW apply per worker
+    WEB_HOST: str = "0.0.0.0"
+    WEB_PORT: int = 80
+    WEB_WORKERS: int = 0  # 0 = one per CPU; application.serve exports the resolved count to its workers
+    WEB_GRACEFUL_TIMEOUT: int = 30  # seconds in-flight requests get to finish on shutdown
+    WARMUP_POOL_CONNECTIONS: Optional[int] = None  # connections opened before ready; defaults to DB_POOL_SIZE
+    WARMUP_BROKER_TIMEOUT: float = 5
+    HEALTH_CHECK_TIMEOUT: float = 2
 
     # Celery
     CELERY_BROKER_URL: str
 
+    # Redis (optional, shared cache tier across API workers)
+    REDIS_URL: Optional[str] = None
+    REDIS_SOCKET_TIMEOUT: float = 0.5
+
+    # Rate limiting: (requests, window seconds) per key; shared through Redis when REDIS_URL is set.
+    # Client IPs come from request.client, so behind a proxy set uvicorn's FORWARDED_ALLOW_IPS.
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_CACHE_SIZE: int = 100000  # keys tracked per limit by the in-process backend
+    LOGIN_RATE_LIMIT_PER_IP: tuple[int, int] = (30, 60)
+    LOGIN_RATE_LIMIT_PER_PHONE: tuple[int, int] = (10, 900)
+    UPLOAD_RATE_LIMIT_PER_USER: tuple[int, int] = (200, 3600)  # counted per visit, so batches use one per item
+
+    # Principal cache
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL: float = 30
+    PRINCIPAL_CACHE_REDIS_TTL: int = 600
+
+    # Storage
+    STORAGE_BACKEND: str = "local"
+    STORAGE_PATH: str = "storage"
+    MAX_UPLOAD_SIZE: int = 50 * 1024 * 1024
+    MAX_UPLOAD_FORM_OVERHEAD: int = 64 * 1024  # multipart headers and form fields allowed per file
+    UPLOAD_CHUNK_SIZE: int = 256 * 1024
+    MAX_BATCH_UPLOAD_ITEMS: int = 50
+    UPLOAD_STAGING_PATH: str = "storage/uploads"  # resumable upload sessions; local to each web host
+    UPLOAD_SESSION_TTL: int = 24 * 3600  # seconds since the last chunk before a session is abandoned
+    UPLOAD_GC_INTERVAL: int = 600
+    VOICE_CACHE_MAX_AGE: int = 86400
+
+    # Geo queries
+    GEO_MAX_RADIUS_KM: float = 100
+    GEO_MAX_CANDIDATES: int = 5000
+
+    # Export
+    EXPORT_BATCH_SIZE: int = 500  # rows per server-side cursor fetch
+    EXPORT_FLUSH_SIZE: int = 64 * 1024  # bytes buffered before a response chunk is sent
+
+    # Statistics rollup
+    STATS_TIMEZONE: str = "Asia/Tehran"  # visits are counted per local business day
+    STATS_MAX_RANGE_DAYS: int = 800
+
+    # Metrics
+    METRICS_TOKEN: Optional[str] = None  # bearer token for /metrics scrapers; unset = admin session only
+
+    # Search
+    SEARCH_MAX_CANDIDATES: int = 2000  # newest matching rows ranked per query (in process without pg_trgm)
+
+    # Audio transcoding
+    AUDIO_QUEUE: str = "audio"
+    FFMPEG_BINARY: str = "ffmpeg"
+    TRANSCODE_BITRATE: str = "32k"
+    TRANSCODE_TIMEOUT: int = 300
+
     class Config:
         env_file = "../.env"
         case_sensitive = True
@@ -0,0 +1,97 @@
+from collections import Counter
+from datetime import date, datetime, timedelta
+import pytz
+from sqlalchemy import Date, Integer, String, cast, extract, func, literal, type_coerce
+from sqlalchemy.dialects import postgresql, sqlite
+from application import models
+from application.setting import settings
+
+UPSERT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def visit_day(visit_timestamp: datetime) -> date:
+    """Business day (STATS_TIMEZONE) of ``visit_timestamp``; naive values are UTC, as stored."""
+    if visit_timestamp.tzinfo is None:
+        visit_timestamp = pytz.UTC.localize(visit_timestamp)
+    return visit_timestamp.astimezone(pytz.timezone(settings.STATS_TIMEZONE)).date()
+
+
+def day_start_utc(day: date) -> datetime:
+    """Naive UTC instant at which ``day`` starts in STATS_TIMEZONE."""
+    local_midnight = pytz.timezone(settings.STATS_TIMEZONE).localize(datetime.combine(day, datetime.min.time()))
+    return local_midnight.astimezone(pytz.UTC).replace(tzinfo=None)
+
+
+def count_visits(visits):
+    """``(day -> visits, (day, user_id) -> visits)``; rows without a user only count towards the day."""
+    days, user_days = Counter(), Counter()
+    for visit in visits:
+        day = visit_day(visit.visit_timestamp)
+        days[day] += 1
+        if visit.user_id is not None:
+            user_days[(day, visit.user_id)] += 1
+    return days, user_days
+
+
+def upsert_increment(dialect_name: str, model, keys, rows):
+    statement = UPSERT_INSERTS[dialect_name](model).values(rows)
+    return statement.on_conflict_do_update(
+        index_elements=keys, set_={"visit_count": model.visit_count + statement.excluded.visit_count}
+    )
+
+
+def increment_statements(dialect_name: str, counts):
+    """``INSERT ... ON CONFLICT DO UPDATE`` statements adding ``count_visits`` output to both rollups.
+
+    Always the day table first and rows in key order, so concurrent writers
+    (and ``crud.rebuild_visit_stats``) take locks in the same order.
+    """
+    days, user_days = counts
+    statements = []
+    if days:
+        statements.append(upsert_increment(dialect_name, models.VisitStatsDay, ["day"], [
+            {"day": day, "visit_count": count} for day, count in sorted(days.items())
+        ]))
+    if user_days:
+        statements.append(upsert_increment(dialect_name, models.VisitStatsUserDay, ["day", "user_id"], [
+            {"day": day, "user_id": user_id, "visit_count": count}
+            for (day, user_id), count in sorted(user_days.items())
+        ]))
+    return statements
+
+
+def period_start(day: date, period: str) -> date:
+    if period == "week":
+        return day - timedelta(days=(day.weekday() - 5) % 7)  # weeks start on Saturday
+    if period == "month":
+        return day.replace(day=1)
+    return day
+
+
+def period_expression(dialect_name: str, day_column, period: str):
+    """SQL for ``period_start(day_column, period)``, so rollup rows are summed per bucket in the database."""
+    if period == "day":
+        return day_column
+    if dialect_name == "postgresql":
+        if period == "week":
+            return day_column - cast((extract("dow", day_column) + 1) % 7, Integer)
+        return cast(func.date_trunc("month", day_column), Date)
+    if period == "week":
+        days_since_saturday = (cast(func.strftime("%w", day_column), Integer) + 1) % 7
+        return type_coerce(func.date(day_column, literal("-") + cast(days_since_saturday, String) + " days"), Date)
+    return type_coerce(func.date(day_column, "start of month"), Date)
+
+
+def bucket_visits(visits, period: str, by: str):
+    """Count ``(user_id, visit_timestamp)`` rows per ``period`` bucket, and per rep when ``by == "user"``."""
+    totals = Counter(
+        (period_start(visit_day(visit.visit_timestamp), period), visit.user_id if by == "user" else None)
+        for visit in visits
+    )
+    return [
+        {"period": period_day, "user_id": user_id, "visit_count": count}
+        for (period_day, user_id), count in sorted(totals.items(), key=lambda item: (item[0][0], item[0][1] or 0))
+    ]
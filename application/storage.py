@@ -0,0 +1,170 @@
+import hashlib
+import os
+import tempfile
+from functools import lru_cache
+from application.setting import settings
+
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class BlobNotFound(Exception):
+    pass
+
+
+class BlobTooLarge(Exception):
+    pass
+
+
+class BlobWriter:
+    """Incremental writer returned by ``BlobStorage.writer``.
+
+    Hashes and counts bytes as they arrive; ``commit`` returns ``(hash, size)``.
+    """
+
+    def __init__(self, max_size: int = None):
+        self.max_size = max_size
+        self.size = 0
+        self._sha256 = hashlib.sha256()
+
+    def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.max_size is not None and self.size > self.max_size:
+            self.abort()
+            raise BlobTooLarge(self.size)
+        self._sha256.update(chunk)
+        self._write(chunk)
+
+    def _write(self, chunk: bytes) -> None:
+        raise NotImplementedError
+
+    def commit(self):
+        raise NotImplementedError
+
+    def abort(self) -> None:
+        raise NotImplementedError
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+
+
+class BlobStorage:
+    """Content-addressed storage for voice files.
+
+    Blobs are keyed by the hex SHA-256 of their content, so writing the same
+    recording twice is a no-op. Backends only need to implement the methods
+    below; ``local_path`` may return None for remote stores (S3 and friends).
+    """
+
+    def writer(self, max_size: int = None) -> BlobWriter:
+        raise NotImplementedError
+
+    def put(self, data: bytes) -> str:
+        with self.writer() as writer:
+            writer.write(data)
+            blob_hash, _ = writer.commit()
+        return blob_hash
+
+    def put_file(self, fileobj):
+        """Copy an open binary file into the store in chunks; returns ``(hash, size)``."""
+        with self.writer() as writer:
+            while chunk := fileobj.read(CHUNK_SIZE):
+                writer.write(chunk)
+            return writer.commit()
+
+    def open(self, blob_hash: str):
+        raise NotImplementedError
+
+    def exists(self, blob_hash: str) -> bool:
+        raise NotImplementedError
+
+    def delete(self, blob_hash: str) -> None:
+        raise NotImplementedError
+
+    def local_path(self, blob_hash: str):
+        return None
+
+
+class LocalBlobWriter(BlobWriter):
+    def __init__(self, storage: "LocalBlobStorage", max_size: int = None):
+        super().__init__(max_size)
+        self.storage = storage
+        fd, self.tmp_path = tempfile.mkstemp(dir=storage.tmp_dir)
+        self._file = os.fdopen(fd, "wb")
+
+    def _write(self, chunk: bytes) -> None:
+        self._file.write(chunk)
+
+    def commit(self):
+        blob_hash = self._sha256.hexdigest()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self.storage._commit(self.tmp_path, blob_hash)
+        return blob_hash, self.size
+
+    def abort(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+class LocalBlobStorage(BlobStorage):
+    """Filesystem backend, sharded as ``<root>/ab/cd/abcd...`` to keep directories small."""
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self.tmp_dir = os.path.join(self.root, "tmp")
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def _path(self, blob_hash: str) -> str:
+        return os.path.join(self.root, blob_hash[:2], blob_hash[2:4], blob_hash)
+
+    def _commit(self, tmp_path: str, blob_hash: str) -> None:
+        path = self._path(blob_hash)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+
+    def writer(self, max_size: int = None) -> BlobWriter:
+        return LocalBlobWriter(self, max_size)
+
+    def open(self, blob_hash: str):
+        try:
+            return open(self._path(blob_hash), "rb")
+        except FileNotFoundError:
+            raise BlobNotFound(blob_hash)
+
+    def exists(self, blob_hash: str) -> bool:
+        return os.path.exists(self._path(blob_hash))
+
+    def delete(self, blob_hash: str) -> None:
+        try:
+            os.remove(self._path(blob_hash))
+        except FileNotFoundError:
+            pass
+
+    def local_path(self, blob_hash: str):
+        path = self._path(blob_hash)
+        return path if os.path.exists(path) else None
+
+
+BACKENDS = {
+    "local": lambda: LocalBlobStorage(settings.STORAGE_PATH),
+}
+
+
+@lru_cache(maxsize=1)
+def get_storage() -> BlobStorage:
+    try:
+        factory = BACKENDS[settings.STORAGE_BACKEND]
+    except KeyError:
+        raise ValueError(f"Unknown storage backend: {settings.STORAGE_BACKEND}")
+    return factory()
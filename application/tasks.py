@@ -1,8 +1,10 @@
-import functools, requests
+import functools
 from celery import Celery
+from celery.exceptions import Ignore
 from application.logger_config import celery_logger
 from application.database import SessionLocal
 from application.setting import settings
+from application.telegram import get_client, TelegramRetryAfter
 import traceback
 from uuid import uuid4
 from contextlib import contextmanager
@@ -12,6 +14,9 @@ celery_app = Celery(
     broker=settings.CELERY_BROKER_URL,
     backend=None
 )
+celery_app.conf.task_routes = {
+    "application.tasks.transcode_visit_audio": {"queue": settings.AUDIO_QUEUE},
+}
 
 @contextmanager
 def session_scope():
@@ -26,48 +31,155 @@ def session_scope():
         db.close()
 
 
-@celery_app.task(autoretry_for=(Exception,), retry_kwargs={"max_retries": 3, "countdown": 5})
-def report_to_admin_api(msg, message_thread_id=settings.ERR_THREAD_ID, reply_markup=None):
-    json_data = {'chat_id': settings.TELEGRAM_CHAT_ID, 'text': msg[:4096], 'message_thread_id': message_thread_id}
-    if reply_markup:
-        json_data['reply_markup'] = reply_markup
-    response = requests.post(
-        url=f"https://api.telegram.org/bot{settings.TELEGRAM_TOKEN}/sendMessage",
-        json=json_data,
-        timeout=10
+def retry_after(task, exc: TelegramRetryAfter, args=None):
+    """Reschedule ``task`` for when Telegram will take the call.
+
+    Only Telegram's own 429 answers count against TELEGRAM_RATE_LIMIT_RETRIES.
+    A limiter deferral already holds its send slot, so it is re-sent with
+    ``reserved=True`` and an unchanged retry count.
+    """
+    if exc.reserved:
+        task.signature_from_request(
+            args=args, kwargs={**task.request.kwargs, "reserved": True},
+            countdown=exc.retry_after, retries=task.request.retries
+        ).apply_async()
+        return Ignore()
+    return task.retry(
+        args=args, kwargs={**task.request.kwargs, "reserved": False}, exc=exc,
+        countdown=exc.retry_after, max_retries=settings.TELEGRAM_RATE_LIMIT_RETRIES
     )
-    response.raise_for_status()
 
-@celery_app.task(autoretry_for=(Exception,), retry_kwargs={"max_retries": 3, "countdown": 5})
-def send_voice_to_telegram(visit_id: int):
-    """Send voice file to Telegram chat/thread"""
-    from application import crud
+
+@celery_app.task(bind=True, autoretry_for=(Exception,), retry_kwargs={"max_retries": 3, "countdown": 5})
+def report_to_admin_api(self, msg, message_thread_id=settings.ERR_THREAD_ID, reply_markup=None, reserved=False):
+    try:
+        get_client().send_message(settings.TELEGRAM_CHAT_ID, msg[:4096], message_thread_id, reply_markup, reserved)
+    except TelegramRetryAfter as e:
+        raise retry_after(self, e)
+
+def deliver_visit_voice(visit_id: int, reserved: bool = False):
+    """Send one visit's voice file to the visits thread, by cached file_id when Telegram already has it.
+
+    Raises ``TelegramRetryAfter`` for the calling task to reschedule; ``reserved``
+    is passed through to the client (see ``TelegramClient.call``).
+    """
+    from application import audio, crud, storage
     import io
-    
+
     with session_scope() as db:
-        visit_record = crud.get_visit_by_visit_id(db, visit_id)
+        visit_record = crud.get_visit_metadata(db, visit_id)
         if not visit_record:
             celery_logger.error(f"Visit record {visit_id} not found")
             return
-        
-        # Prepare the voice file
-        voice_file = io.BytesIO(visit_record.file_data)
-        voice_file.name = visit_record.filename
-        
-        # Send voice to Telegram
-        url = f"https://api.telegram.org/bot{settings.TELEGRAM_TOKEN}/sendVoice"
-        files = {'voice': (visit_record.filename, voice_file, visit_record.content_type)}
-        data = {
-            'chat_id': settings.TELEGRAM_CHAT_ID,
-            'message_thread_id': settings.VISITS_THREAD_ID,
-            'caption': (
-                f"🎧 فایل صوتی\n"
+        db.expunge(visit_record)
+        legacy_bytes = None if visit_record.file_hash else crud.get_visit_file_data(db, visit_id)
+
+    caption = f"🎧 فایل صوتی\n"
+    if visit_record.telegram_file_id:
+        get_client().send_voice(
+            settings.TELEGRAM_CHAT_ID, visit_record.telegram_file_id,
+            message_thread_id=settings.VISITS_THREAD_ID, caption=caption, reserved=reserved
+        )
+        celery_logger.info(f"Voice file re-sent to Telegram by file_id for visit_id: {visit_id}")
+        return
+
+    filename, content_type = visit_record.filename, visit_record.content_type
+    if visit_record.compact_file_hash and visit_record.compact_file_hash != visit_record.file_hash:
+        voice_file = storage.get_storage().open(visit_record.compact_file_hash)
+        filename, content_type = audio.compact_filename(filename), visit_record.compact_content_type
+    elif visit_record.file_hash:
+        voice_file = storage.get_storage().open(visit_record.file_hash)
+    else:
+        voice_file = io.BytesIO(legacy_bytes)
+    with voice_file:
+        result = get_client().send_voice(
+            settings.TELEGRAM_CHAT_ID,
+            (filename, voice_file, content_type),
+            message_thread_id=settings.VISITS_THREAD_ID,
+            caption=caption,
+            reserved=reserved
+        )
+
+    # Telegram only returns a reusable voice file_id when it accepted the file as a voice note.
+    file_id = result.get("result", {}).get("voice", {}).get("file_id")
+    if file_id:
+        with session_scope() as db:
+            crud.set_visit_telegram_file_id(db, visit_id, file_id)
+    celery_logger.info(f"Voice file sent to Telegram for visit_id: {visit_id}")
+
+@celery_app.task(bind=True, autoretry_for=(Exception,), retry_kwargs={"max_retries": 3, "countdown": 5})
+def send_voice_to_telegram(self, visit_id: int, reserved: bool = False):
+    """Send voice file to Telegram chat/thread"""
+    try:
+        deliver_visit_voice(visit_id, reserved)
+    except TelegramRetryAfter as e:
+        raise retry_after(self, e)
+
+@celery_app.task(bind=True)
+def send_voices_to_telegram(self, visit_ids: list, reserved: bool = False):
+    """Batched ``send_voice_to_telegram`` for /visit/upload_batch.
+
+    A rate limit applies to the whole chat, so it reschedules the rest of the
+    batch. Any other failure is specific to one visit: that visit is handed
+    to its own ``send_voice_to_telegram`` with the usual retries, and the
+    batch carries on with the next one. ``reserved`` covers the first visit only.
+    """
+    for position, visit_id in enumerate(visit_ids):
+        try:
+            deliver_visit_voice(visit_id, reserved and position == 0)
+        except TelegramRetryAfter as e:
+            raise retry_after(self, e, args=(visit_ids[position:],))
+        except Exception as e:
+            celery_logger.warning(
+                f"Voice delivery failed for visit_id: {visit_id}; retrying it on its own", extra={"error": str(e)}
             )
-        }
-        
-        response = requests.post(url, files=files, data=data, timeout=30)
-        response.raise_for_status()
-        celery_logger.info(f"Voice file sent to Telegram for visit_id: {visit_id}")
+            send_voice_to_telegram.apply_async(args=(visit_id,), countdown=5)
+
+@celery_app.task(bind=True, autoretry_for=(Exception,), retry_kwargs={"max_retries": 3, "countdown": 30})
+def transcode_visit_audio(self, visit_id: int):
+    """Store a normalised Opus copy of a visit's audio; runs on the AUDIO_QUEUE prefork worker"""
+    from application import audio, crud, storage
+    import os
+    import tempfile
+
+    with session_scope() as db:
+        visit_record = crud.get_visit_metadata(db, visit_id)
+        if not visit_record:
+            celery_logger.error(f"Visit record {visit_id} not found")
+            return
+        db.expunge(visit_record)
+
+    if visit_record.compact_file_hash:
+        return
+    if not visit_record.file_hash:
+        celery_logger.warning(f"Visit {visit_id} has no blob yet; run the blob backfill before transcoding")
+        return
+
+    blob_store = storage.get_storage()
+    compact = (visit_record.file_hash, visit_record.file_size, visit_record.content_type)
+
+    if audio.codec_available():
+        with tempfile.TemporaryDirectory() as work_dir:
+            source_path = blob_store.local_path(visit_record.file_hash)
+            if source_path is None:
+                source_path = os.path.join(work_dir, "source")
+                with blob_store.open(visit_record.file_hash) as blob, open(source_path, "wb") as source:
+                    while chunk := blob.read(storage.CHUNK_SIZE):
+                        source.write(chunk)
+
+            target_path = os.path.join(work_dir, "compact.ogg")
+            audio.transcode_to_opus(source_path, target_path)
+            # Only a smaller result becomes a blob; otherwise the original doubles as the compact copy.
+            if os.path.getsize(target_path) < visit_record.file_size:
+                with open(target_path, "rb") as target:
+                    file_hash, file_size = blob_store.put_file(target)
+                compact = (file_hash, file_size, audio.COMPACT_CONTENT_TYPE)
+    else:
+        celery_logger.warning(f"No audio codec available; keeping original audio for visit_id: {visit_id}")
+
+    with session_scope() as db:
+        crud.set_visit_compact_file(db, visit_id, *compact)
+    celery_logger.info(f"Compact audio stored for visit_id: {visit_id}", extra={"size": compact[1]})
 
 def handle_task_errors(func):
     @functools.wraps(func)
@@ -0,0 +1,154 @@
+import os
+import threading
+import time
+import httpx
+from application.setting import settings
+
+
+class TelegramRetryAfter(Exception):
+    """Raised when a call must wait ``retry_after`` seconds, either because Telegram
+    answered 429 or because the local limiter would block for too long.
+
+    ``reserved`` is True for limiter deferrals: the send slot ``retry_after``
+    seconds from now is already taken, so the retried call passes
+    ``reserved=True`` instead of queueing again.
+    """
+
+    def __init__(self, retry_after: float, reserved: bool = False):
+        super().__init__(f"retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+        self.reserved = reserved
+
+    def __reduce__(self):
+        return type(self), (self.retry_after, self.reserved)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take the next free slot; returns the seconds until it starts.
+
+        Tokens go negative while slots are handed out ahead of time, so
+        callers that have to come back later queue up one slot apart
+        instead of all waking at once.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+            wait = max(self.blocked_until - now, 0.0)
+            if self.tokens < 1:
+                wait = max(wait, (1 - self.tokens) / self.rate)
+            self.tokens -= 1
+            return wait
+
+    def paused_for(self) -> float:
+        with self._lock:
+            return max(self.blocked_until - time.monotonic(), 0.0)
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class TelegramClient:
+    """Keep-alive Bot API client with a token bucket per chat/thread.
+
+    One instance per worker process (see ``get_client``); it is thread safe,
+    so the ``--pool=threads`` worker shares its connections.
+    """
+
+    def __init__(self, token: str, base_url: str):
+        self._http = httpx.Client(
+            base_url=f"{base_url.rstrip('/')}/bot{token}/",
+            timeout=settings.TELEGRAM_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=settings.TELEGRAM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.TELEGRAM_MAX_CONNECTIONS,
+            ),
+        )
+        self._buckets = {}
+        self._buckets_lock = threading.Lock()
+
+    def _bucket(self, chat_id, thread_id) -> TokenBucket:
+        key = (chat_id, thread_id)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            with self._buckets_lock:
+                bucket = self._buckets.setdefault(
+                    key, TokenBucket(settings.TELEGRAM_RATE_PER_SECOND, settings.TELEGRAM_RATE_BURST)
+                )
+        return bucket
+
+    def call(self, method: str, chat_id, thread_id=None, timeout: float = None, reserved: bool = False,
+             **request_kwargs) -> dict:
+        """POST ``method`` once the chat/thread limiter allows it.
+
+        Waits longer than ``TELEGRAM_MAX_LIMITER_WAIT`` are not slept: the slot
+        is reserved and ``TelegramRetryAfter(wait, reserved=True)`` tells the
+        caller when to come back with ``reserved=True``.
+        """
+        bucket = self._bucket(chat_id, thread_id)
+        wait = bucket.paused_for() if reserved else bucket.reserve()
+        if wait > settings.TELEGRAM_MAX_LIMITER_WAIT:
+            raise TelegramRetryAfter(wait, reserved=True)
+        if wait:
+            time.sleep(wait)
+
+        response = self._http.post(method, timeout=timeout or settings.TELEGRAM_TIMEOUT, **request_kwargs)
+        if response.status_code == 429:
+            retry_after = response.json().get("parameters", {}).get("retry_after", 5)
+            bucket.pause(retry_after)
+            raise TelegramRetryAfter(retry_after)
+        response.raise_for_status()
+        return response.json()
+
+    def send_message(self, chat_id, text: str, message_thread_id=None, reply_markup=None,
+                     reserved: bool = False) -> dict:
+        json_data = {"chat_id": chat_id, "text": text, "message_thread_id": message_thread_id}
+        if reply_markup:
+            json_data["reply_markup"] = reply_markup
+        return self.call("sendMessage", chat_id, message_thread_id, reserved=reserved, json=json_data)
+
+    def send_voice(self, chat_id, voice, message_thread_id=None, caption: str = None, reserved: bool = False) -> dict:
+        """``voice`` is either a Telegram ``file_id`` or a ``(filename, file, content_type)``
+        tuple; open files are streamed, not read into memory."""
+        data = {"chat_id": chat_id}
+        if message_thread_id is not None:
+            data["message_thread_id"] = message_thread_id
+        if caption:
+            data["caption"] = caption
+        if isinstance(voice, str):
+            data["voice"] = voice
+            return self.call("sendVoice", chat_id, message_thread_id, reserved=reserved, data=data)
+        return self.call(
+            "sendVoice", chat_id, message_thread_id, reserved=reserved,
+            data=data, files={"voice": voice}, timeout=settings.TELEGRAM_UPLOAD_TIMEOUT
+        )
+
+    def close(self):
+        self._http.close()
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> TelegramClient:
+    """Per-process client; a forked worker child builds its own connections."""
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        with _client_lock:
+            if _client is None or _client_pid != os.getpid():
+                _client = TelegramClient(settings.TELEGRAM_TOKEN, settings.TELEGRAM_API_URL)
+                _client_pid = os.getpid()
+    return _client
@@ -0,0 +1,51 @@
+import re
+
+# Arabic code points that Persian keyboards and phones mix in, mapped to their Persian forms.
+CHARACTER_MAP = str.maketrans({
+    "ي": "ی", "ى": "ی", "ئ": "ی",
+    "ك": "ک",
+    "ة": "ه", "ۀ": "ه",
+    "أ": "ا", "إ": "ا", "ٱ": "ا",
+    "ؤ": "و",
+    "\u200c": " ",  # ZWNJ becomes a plain space, so "می‌روم" matches "می روم"
+    "\u200d": "",
+    "\u0640": "",  # tatweel
+    **{chr(0x06F0 + i): str(i) for i in range(10)},  # Persian digits
+    **{chr(0x0660 + i): str(i) for i in range(10)},  # Arabic-Indic digits
+})
+DIACRITICS = re.compile("[\u064B-\u065F\u0670]")
+WHITESPACE = re.compile(r"\s+")
+# pg_trgm can only serve LIKE '%term%' from the GIN index when the term has a whole trigram.
+MIN_TERM_LENGTH = 3
+
+
+def normalize_persian(text: str) -> str:
+    """Lower-cased, diacritic-free text with unified Persian letters, digits and spacing."""
+    if not text:
+        return ""
+    text = DIACRITICS.sub("", text.translate(CHARACTER_MAP))
+    return WHITESPACE.sub(" ", text).strip().lower()
+
+
+def search_terms(text: str):
+    return normalize_persian(text).split()
+
+
+def has_indexable_term(terms) -> bool:
+    return any(len(term) >= MIN_TERM_LENGTH for term in terms)
+
+
+def build_search_text(*fields) -> str:
+    return normalize_persian(" ".join(field for field in fields if field))
+
+
+def escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def score_match(search_text: str, terms, phrase: str) -> float:
+    """In-process relevance for databases without trigram support: term hits, plus a phrase bonus."""
+    score = sum(search_text.count(term) for term in terms)
+    if phrase in search_text:
+        score += len(terms)
+    return score
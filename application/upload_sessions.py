@@ -0,0 +1,170 @@
+import asyncio
+import fcntl
+import json
+import os
+import shutil
+import time
+from functools import lru_cache
+from uuid import uuid4
+from application.logger_config import logger
+from application.setting import settings
+
+
+class UploadSessionNotFound(Exception):
+    pass
+
+
+class UploadSessionBusy(Exception):
+    """Another request is already appending to the session."""
+
+
+class UploadOffsetMismatch(Exception):
+    def __init__(self, offset: int):
+        super().__init__(f"upload is at offset {offset}")
+        self.offset = offset
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class ChunkAppender:
+    """Appends one chunk request to a staged upload.
+
+    Holds an exclusive ``flock`` on the data file while open, so concurrent
+    PUTs for the same session (possibly on other workers) are refused instead
+    of interleaving. Bytes written before a dropped connection are kept; the
+    client resumes from the offset they add up to.
+    """
+
+    def __init__(self, path: str, offset: int, total_size: int):
+        self.total_size = total_size
+        self._file = open(path, "ab")
+        try:
+            fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._file.close()
+            raise UploadSessionBusy(path)
+        self.offset = self._file.seek(0, os.SEEK_END)
+        if offset != self.offset:
+            self.close()
+            raise UploadOffsetMismatch(self.offset)
+
+    def write(self, chunk: bytes) -> None:
+        if self.offset + len(chunk) > self.total_size:
+            raise UploadTooLarge(self.offset + len(chunk))
+        self._file.write(chunk)
+        self.offset += len(chunk)
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+
+
+class UploadStaging:
+    """Resumable upload sessions staged on local disk as ``<root>/<upload_id>/{meta.json,data}``.
+
+    A session expires UPLOAD_SESSION_TTL seconds after its last chunk;
+    ``collect_garbage`` removes expired sessions.
+    """
+
+    def __init__(self, root: str, ttl: int):
+        self.root = os.path.abspath(root)
+        self.ttl = ttl
+        os.makedirs(self.root, exist_ok=True)
+
+    def _dir(self, upload_id: str) -> str:
+        if not upload_id.isalnum():
+            raise UploadSessionNotFound(upload_id)
+        return os.path.join(self.root, upload_id)
+
+    def data_path(self, upload_id: str) -> str:
+        return os.path.join(self._dir(upload_id), "data")
+
+    def create(self, user_id: int, total_size: int, metadata: dict) -> dict:
+        upload_id = uuid4().hex
+        session_dir = self._dir(upload_id)
+        os.makedirs(session_dir)
+        session = {"upload_id": upload_id, "user_id": user_id, "total_size": total_size, "metadata": metadata}
+        with open(os.path.join(session_dir, "meta.json"), "w") as meta:
+            json.dump(session, meta)
+        open(self.data_path(upload_id), "wb").close()
+        return self._with_progress(session)
+
+    def _with_progress(self, session: dict) -> dict:
+        stat = os.stat(self.data_path(session["upload_id"]))
+        return {**session, "offset": stat.st_size, "expires_at": stat.st_mtime + self.ttl}
+
+    def get(self, upload_id: str, user_id: int) -> dict:
+        """Session with its current ``offset``; other users' and expired sessions are not found."""
+        try:
+            with open(os.path.join(self._dir(upload_id), "meta.json")) as meta:
+                session = json.load(meta)
+            session = self._with_progress(session)
+        except (FileNotFoundError, ValueError):
+            raise UploadSessionNotFound(upload_id)
+        if session["user_id"] != user_id or session["expires_at"] < time.time():
+            raise UploadSessionNotFound(upload_id)
+        return session
+
+    def appender(self, session: dict, offset: int) -> ChunkAppender:
+        return ChunkAppender(self.data_path(session["upload_id"]), offset, session["total_size"])
+
+    def claim(self, upload_id: str) -> str:
+        """Atomically take a session for finalizing and return its data path.
+
+        The session directory is renamed away, so a second finalize of the
+        same upload gets UploadSessionNotFound. Follow with ``finish`` or ``release``.
+        """
+        try:
+            os.rename(self._dir(upload_id), self._dir(f"{upload_id}claimed"))
+        except FileNotFoundError:
+            raise UploadSessionNotFound(upload_id)
+        return os.path.join(self._dir(f"{upload_id}claimed"), "data")
+
+    def release(self, upload_id: str) -> None:
+        os.rename(self._dir(f"{upload_id}claimed"), self._dir(upload_id))
+
+    def finish(self, upload_id: str) -> None:
+        self.delete(f"{upload_id}claimed")
+
+    def delete(self, upload_id: str) -> None:
+        shutil.rmtree(self._dir(upload_id), ignore_errors=True)
+
+    def collect_garbage(self) -> int:
+        expired_before = time.time() - self.ttl
+        removed = 0
+        for upload_id in os.listdir(self.root):
+            if not upload_id.isalnum():
+                continue
+            try:
+                try:
+                    last_activity = os.stat(self.data_path(upload_id)).st_mtime
+                except FileNotFoundError:
+                    # Half-created session: fall back to the directory's own age.
+                    last_activity = os.stat(self._dir(upload_id)).st_mtime
+            except FileNotFoundError:
+                continue
+            if last_activity < expired_before:
+                self.delete(upload_id)
+                removed += 1
+        return removed
+
+
+@lru_cache(maxsize=1)
+def get_staging() -> UploadStaging:
+    return UploadStaging(settings.UPLOAD_STAGING_PATH, settings.UPLOAD_SESSION_TTL)
+
+
+async def run_garbage_collector():
+    """Background loop started from the app lifespan; drops abandoned upload sessions."""
+    while True:
+        try:
+            removed = await asyncio.to_thread(get_staging().collect_garbage)
+            if removed:
+                logger.info("upload_sessions:collect_garbage", extra={"removed": removed})
+        except Exception as e:
+            logger.error("upload_sessions:collect_garbage", extra={"error": str(e)})
+        await asyncio.sleep(settings.UPLOAD_GC_INTERVAL)
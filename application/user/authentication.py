@@ -1,12 +1,12 @@
 from fastapi import Request, Depends, Response, APIRouter, HTTPException, Cookie
 from fastapi.responses import RedirectResponse
-from application import crud, schemas
+from application import async_crud, schemas
 from application.setting import settings
-from sqlalchemy.orm import Session
-from application.auth import create_access_token, create_refresh_token, hash_password_md5, set_cookie
+from sqlalchemy.ext.asyncio import AsyncSession
+from application.auth import create_access_token, create_refresh_token, set_cookie
+from application import hashers
 from application.logger_config import logger
-from application.helper import endpoint_helper
-from application import tasks
+from application.helper import endpoint_helper, notifier, rate_limit
 
 FILE_NAME = "user:authentication"
 handle_errors = endpoint_helper.handle_endpoint_errors(FILE_NAME)
@@ -19,22 +19,28 @@ router = APIRouter(
 
 @router.post('/login')
 @handle_errors
-async def login(request: Request, response: Response, data: schemas.LogInRequirement, db: Session = Depends(endpoint_helper.get_db)):
+async def login(request: Request, response: Response, data: schemas.LogInRequirement, db: AsyncSession = Depends(endpoint_helper.get_async_db)):
+    client_ip = request.client.host if request.client else None
+    await rate_limit.enforce(rate_limit.LOGIN_BY_IP, client_ip)
+
     phone = data.phone_number.strip()
     if not phone.startswith("09") or len(phone) != 11 or not phone.isdigit():
         raise HTTPException(
             status_code=400,
             detail="Invalid phone number. It must start with '09' and contain exactly 11 digits."
         )
+    await rate_limit.enforce(rate_limit.LOGIN_BY_PHONE, phone)
 
-    db_user = crud.get_user_by_phone_number(db, data.phone_number)
+    db_user = await async_crud.get_user_by_phone_number(db, data.phone_number)
 
     if not db_user:
         raise HTTPException(status_code=404, detail="User does not found")
     else:
-        hash_password = hash_password_md5(data.password)
-        if hash_password != db_user.hashed_password:
+        valid, needs_rehash = await hashers.verify_password(data.password, db_user.hashed_password)
+        if not valid:
             raise HTTPException(status_code=403, detail="Password is not correct")
+        if needs_rehash:
+            await async_crud.update_user_password(db, db_user, await hashers.hash_password(data.password))
         user_data = {
             "first_name": db_user.first_name,
             "user_id": db_user.user_id
@@ -43,8 +49,8 @@ async def login(request: Request, response: Response, data: schemas.LogInRequire
         cr_refresh_token = create_refresh_token(data=user_data)
         set_cookie(response, "access_token", access_token, settings.ACCESS_TOKEN_EXP_MIN * 60)
         set_cookie(response, "refresh_token", cr_refresh_token, settings.REFRESH_TOKEN_EXP_MIN * 60)
+        await rate_limit.LOGIN_BY_PHONE.reset(phone)
 
-        client_ip = request.client.host if request.client else None
         user_agent = request.headers.get("user-agent")
 
         message = (f"🔵 New User Logged In!"
@@ -55,7 +61,8 @@ async def login(request: Request, response: Response, data: schemas.LogInRequire
                    f"\nClient IP: {client_ip}"
                    f"\nUser Agent: {user_agent}")
 
-        tasks.report_to_admin_api.delay(message, message_thread_id=settings.INFO_THREAD_ID)
+        notifier.notify(db, message, settings.INFO_THREAD_ID)
+        await db.commit()
 
         logger.info(f"{FILE_NAME}:login", extra={"phone_number": data.phone_number})
         return {'status': 'OK'}
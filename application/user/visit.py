@@ -1,18 +1,151 @@
-from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, Request, Response
-from application.helper import endpoint_helper
-from sqlalchemy.orm import Session
-from application import crud, tasks
+import json
+import time
+from datetime import datetime
+from pydantic import ValidationError
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, Request, Response, Query
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
+from application.helper import endpoint_helper, response_helper, pagination, notifier, export, rate_limit
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Literal
+from application import async_crud, tasks, audio, schemas, geo, storage, upload_sessions, outbox, text_normalization
+from application.admin.manage import require_admin
 from application.setting import settings
 from application.logger_config import logger
 
 FILE_NAME = "user:visit"
 handle_errors = endpoint_helper.handle_endpoint_errors(FILE_NAME)
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".ogg", ".m4a", ".webm")
 
 router = APIRouter(
     prefix="/visit",
     tags=["Visit Data"]
 )
 
+@router.get("", response_model=schemas.VisitPage)
+@handle_errors
+async def list_visits(
+    user_id: int = None,
+    hs_unique_code: str = None,
+    date_from: datetime = None,
+    date_to: datetime = None,
+    cursor: str = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(endpoint_helper.get_async_db),
+    is_admin = Depends(require_admin)
+):
+    after = pagination.decode_cursor(cursor) if cursor else None
+    visits = await async_crud.list_visits(
+        db, limit + 1, after=after, user_id=user_id, hs_unique_code=hs_unique_code,
+        date_from=date_from, date_to=date_to
+    )
+
+    next_cursor = None
+    if len(visits) > limit:
+        visits = visits[:limit]
+        next_cursor = pagination.encode_cursor(visits[-1].visit_timestamp, visits[-1].id)
+    return {"items": visits, "next_cursor": next_cursor}
+
+@router.get("/export")
+@handle_errors
+async def export_visits(
+    format: Literal["ndjson", "csv", "zip"] = "ndjson",
+    user_id: int = None,
+    hs_unique_code: str = None,
+    date_from: datetime = None,
+    date_to: datetime = None,
+    is_admin = Depends(require_admin)
+):
+    """Stream every matching visit; ``zip`` bundles the metadata with the audio files."""
+    filters = dict(user_id=user_id, hs_unique_code=hs_unique_code, date_from=date_from, date_to=date_to)
+    filename = f"visits-{datetime.now():%Y%m%d-%H%M%S}.{format}"
+    return StreamingResponse(
+        export.export_visits(format, filters),
+        media_type=export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+@router.get("/search", response_model=list[schemas.VisitSummary])
+@handle_errors
+async def search_visits(
+    q: str = Query(..., min_length=text_normalization.MIN_TERM_LENGTH, max_length=200),
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(endpoint_helper.get_async_db),
+    is_admin = Depends(require_admin)
+):
+    if not text_normalization.has_indexable_term(text_normalization.search_terms(q)):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Search needs at least one term of {text_normalization.MIN_TERM_LENGTH} or more characters"
+        )
+    return await async_crud.search_visits(db, q, limit)
+
+@router.get("/near", response_model=list[schemas.NearbyVisit])
+@handle_errors
+async def visits_near(
+    latitude: float = Query(..., ge=-90, le=90),
+    longitude: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(1.0, gt=0, le=settings.GEO_MAX_RADIUS_KM),
+    limit: int = Query(100, ge=1, le=500),
+    db: AsyncSession = Depends(endpoint_helper.get_async_db),
+    is_admin = Depends(require_admin)
+):
+    candidates = await async_crud.find_visits_nearest(db, latitude, longitude, radius_km, settings.GEO_MAX_CANDIDATES)
+
+    nearby = []
+    for visit in candidates:
+        distance = geo.haversine_km(latitude, longitude, visit.latitude, visit.longitude)
+        if distance <= radius_km:
+            summary = schemas.VisitSummary.model_validate(visit)
+            nearby.append(schemas.NearbyVisit(**summary.model_dump(), distance_km=round(distance, 4)))
+    nearby.sort(key=lambda item: item.distance_km)
+    return nearby[:limit]
+
+@router.get("/in_box", response_model=list[schemas.VisitSummary])
+@handle_errors
+async def visits_in_box(
+    min_latitude: float = Query(..., ge=-90, le=90),
+    min_longitude: float = Query(..., ge=-180, le=180),
+    max_latitude: float = Query(..., ge=-90, le=90),
+    max_longitude: float = Query(..., ge=-180, le=180),
+    limit: int = Query(500, ge=1, le=2000),
+    db: AsyncSession = Depends(endpoint_helper.get_async_db),
+    is_admin = Depends(require_admin)
+):
+    if min_latitude > max_latitude or min_longitude > max_longitude:
+        raise HTTPException(status_code=400, detail="min coordinates must not exceed max coordinates")
+    box = (min_latitude, min_longitude, max_latitude, max_longitude)
+    return await async_crud.find_visits_in_box(db, geo.cover_box(*box), *box, limit=limit)
+
+def visit_message(user, visit_id: int, hs_unique_code, place_name, person_name, person_position, address,
+                  latitude, longitude):
+    download_url = f"{settings.PUBLIC_URL}/visit/voice/{visit_id}"
+    return (
+        f"📍 یک ویزیت جدید ثبت شد!\n"
+        f"👨‍💼 کاربر: {user.first_name} {user.last_name}\n"
+        f"📧 ایمیل: {user.email}\n"
+        f"📱 شماره تماس: {user.phone_number or 'N/A'}\n"
+        f"🏢 مکان: {place_name}\n"
+        f"👤 شخص: {person_name} ({person_position or 'N/A'})\n"
+        f"🧭 طول جغرافیایی & عرض جغرافیایی: {latitude}, {longitude}\n"
+        f"🏠 آدرس: {address}\n"
+        f"🧾 کد همکاران سیستم: {hs_unique_code}\n"
+        f"🎧 دانلود فایل صوتی: {download_url}"
+    )
+
+def announce_visit(db: AsyncSession, user, visit_record):
+    """Stage the visits-thread report, voice delivery and transcode in the outbox, in the visit's transaction."""
+    msg = visit_message(
+        user, visit_record.id, visit_record.hs_unique_code, visit_record.place_name, visit_record.person_name,
+        visit_record.person_position, visit_record.address, visit_record.latitude, visit_record.longitude
+    )
+    outbox.enqueue(db, tasks.report_to_admin_api, msg, message_thread_id=settings.VISITS_THREAD_ID)
+
+    # Send voice file directly to Telegram
+    outbox.enqueue(db, tasks.send_voice_to_telegram, visit_record.id)
+    outbox.enqueue(db, tasks.transcode_visit_audio, visit_record.id)
+
 @router.post("/upload")
 @handle_errors
 async def upload_visit_data(
@@ -26,48 +159,240 @@ async def upload_visit_data(
     latitude: float = Form(None),
     longitude: float = Form(None),
     description: str = Form(None),
-    db: Session = Depends(endpoint_helper.get_db)
+    db: AsyncSession = Depends(endpoint_helper.get_async_db)
 ):
     user_data = request.state.user
     if not user_data:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
     user_id = user_data["user_id"]
+    await rate_limit.enforce(rate_limit.UPLOAD_BY_USER, user_id)
 
-    if not file.filename.lower().endswith((".mp3", ".wav", ".ogg", ".m4a", ".webm")):
+    if not file.filename.lower().endswith(AUDIO_EXTENSIONS):
         raise HTTPException(status_code=400, detail="Invalid file format")
 
-    user = crud.get_user_by_user_id(db, user_id)
+    user = await async_crud.get_user_principal(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    file_bytes = await file.read()
+    file_hash, file_size = await endpoint_helper.store_upload(file)
 
-    visit_record = crud.add_new_visit_entry(
-        db, user_id, file, hs_unique_code, file_bytes,
+    visit_record = await async_crud.add_new_visit_entry(
+        db, user_id, file.filename, hs_unique_code, file_hash, file_size,
         place_name, person_name, address, person_position,
-        latitude, longitude, description, file.content_type
+        latitude, longitude, description, file.content_type,
+        before_commit=lambda visit: announce_visit(db, user, visit)
     )
 
-    download_url = f"{settings.PUBLIC_URL}/visit/voice/{visit_record.id}"
-    msg = (
-        f"📍 یک ویزیت جدید ثبت شد!\n"
-        f"👨‍💼 کاربر: {user.first_name} {user.last_name}\n"
-        f"📧 ایمیل: {user.email}\n"
-        f"📱 شماره تماس: {user.phone_number or 'N/A'}\n"
-        f"🏢 مکان: {place_name}\n"
-        f"👤 شخص: {person_name} ({person_position or 'N/A'})\n"
-        f"🧭 طول جغرافیایی & عرض جغرافیایی: {latitude}, {longitude}\n"
-        f"🏠 آدرس: {address}\n"
-        f"🧾 کد همکاران سیستم: {hs_unique_code}\n"
-        f"🎧 دانلود فایل صوتی: {download_url}"
+    logger.info(f"{FILE_NAME}:upload_visit_data", extra={"user_id": user_id, "visit_id": visit_record.id})
+
+    return {
+        "message": "Visit data uploaded successfully",
+        "id": visit_record.id,
+        "filename": visit_record.filename,
+        "timestamp": visit_record.visit_timestamp,
+    }
+
+@router.post("/upload_batch")
+@handle_errors
+async def upload_visit_batch(
+    request: Request,
+    metadata: str = Form(..., description="JSON array of visits, item i describing files[i]"),
+    files: list[UploadFile] = File(...),
+    db: AsyncSession = Depends(endpoint_helper.get_async_db)
+):
+    """Upload visits queued offline on a device in one request.
+
+    Every item is validated and its audio stored before anything is written;
+    the accepted ones are then inserted in one statement and transaction.
+    Rejected items are reported by index so the device can retry just those.
+    """
+    user_data = request.state.user
+    if not user_data:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+    user_id = user_data["user_id"]
+
+    try:
+        raw_items = json.loads(metadata)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="metadata must be a JSON array")
+    if not isinstance(raw_items, list) or len(raw_items) != len(files):
+        raise HTTPException(status_code=400, detail="metadata must be a JSON array with one item per file")
+    if len(files) > settings.MAX_BATCH_UPLOAD_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.MAX_BATCH_UPLOAD_ITEMS} visits per batch")
+    await rate_limit.enforce(rate_limit.UPLOAD_BY_USER, user_id, cost=len(files))
+
+    user = await async_crud.get_user_principal(db, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    results, accepted = [], []
+    for index, (raw_item, file) in enumerate(zip(raw_items, files)):
+        result = {"index": index, "client_ref": raw_item.get("client_ref") if isinstance(raw_item, dict) else None}
+        results.append(result)
+        try:
+            item = schemas.VisitUploadItem.model_validate(raw_item)
+        except ValidationError as e:
+            result.update(status="rejected", error=e.errors(include_url=False, include_context=False, include_input=False))
+            continue
+        if not file.filename.lower().endswith(AUDIO_EXTENSIONS):
+            result.update(status="rejected", error="Invalid file format")
+            continue
+        try:
+            file_hash, file_size = await endpoint_helper.store_upload(file)
+        except HTTPException as e:
+            result.update(status="rejected", error=e.detail)
+            continue
+        accepted.append((result, item, file, file_hash, file_size))
+
+    def announce_batch(rows):
+        messages = [
+            visit_message(
+                user, row.id, item.hs_unique_code, item.place_name, item.person_name, item.person_position,
+                item.address, item.latitude, item.longitude
+            )
+            for (_, item, _, _, _), row in zip(accepted, rows)
+        ]
+        for chunk in notifier.split_message(notifier.build_digest(messages)):
+            outbox.enqueue(db, tasks.report_to_admin_api, chunk, message_thread_id=settings.VISITS_THREAD_ID)
+        outbox.enqueue(db, tasks.send_voices_to_telegram, [row.id for row in rows])
+        # One transcode message per visit so the prefork audio workers can share the batch.
+        for row in rows:
+            outbox.enqueue(db, tasks.transcode_visit_audio, row.id)
+
+    if accepted:
+        rows = await async_crud.add_visit_entries(db, [
+            (
+                user_id, file.filename, item.hs_unique_code, file_hash, file_size,
+                item.place_name, item.person_name, item.address, item.person_position,
+                item.latitude, item.longitude, item.description, file.content_type
+            )
+            for _, item, file, file_hash, file_size in accepted
+        ], before_commit=announce_batch)
+
+        for (result, _, file, _, _), row in zip(accepted, rows):
+            result.update(status="created", id=row.id, filename=file.filename, timestamp=row.visit_timestamp)
+
+    created = len(accepted)
+    logger.info(f"{FILE_NAME}:upload_visit_batch", extra={"user_id": user_id, "visits_created": created,
+                                                          "visits_rejected": len(results) - created})
+    return {"created": created, "rejected": len(results) - created, "items": results}
+
+def get_upload_session(request: Request, upload_id: str):
+    user_data = request.state.user
+    if not user_data:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    try:
+        return upload_sessions.get_staging().get(upload_id, user_data["user_id"])
+    except upload_sessions.UploadSessionNotFound:
+        raise HTTPException(status_code=404, detail="Upload session not found or expired")
+
+def offset_conflict(offset: int):
+    return HTTPException(status_code=409, detail={"message": "Offset mismatch", "offset": offset},
+                         headers={"Upload-Offset": str(offset)})
+
+@router.post("/uploads", response_model=schemas.UploadSessionStatus, status_code=201)
+@handle_errors
+async def create_upload_session(
+    request: Request,
+    upload: schemas.UploadSessionCreate,
+    db: AsyncSession = Depends(endpoint_helper.get_async_db)
+):
+    """Start a resumable upload: PUT chunks to /visit/uploads/{id}?offset=N, then POST .../complete."""
+    user_data = request.state.user
+    if not user_data:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+    if not upload.filename.lower().endswith(AUDIO_EXTENSIONS):
+        raise HTTPException(status_code=400, detail="Invalid file format")
+    if upload.total_size > settings.MAX_UPLOAD_SIZE:
+        raise HTTPException(status_code=413, detail="File is too large")
+    await rate_limit.enforce(rate_limit.UPLOAD_BY_USER, user_data["user_id"])
+    if not await async_crud.get_user_principal(db, user_data["user_id"]):
+        raise HTTPException(status_code=404, detail="User not found")
+
+    return await run_in_threadpool(
+        upload_sessions.get_staging().create, user_data["user_id"], upload.total_size, upload.model_dump()
     )
-    tasks.report_to_admin_api.delay(msg, message_thread_id=settings.VISITS_THREAD_ID)
-    
-    # Send voice file directly to Telegram
-    tasks.send_voice_to_telegram.delay(visit_record.id)
-    
-    logger.info(f"{FILE_NAME}:upload_visit_data", extra={"msg_": msg})
+
+@router.get("/uploads/{upload_id}", response_model=schemas.UploadSessionStatus)
+@router.head("/uploads/{upload_id}", response_model=schemas.UploadSessionStatus, include_in_schema=False)
+@handle_errors
+async def get_upload_offset(request: Request, response: Response, upload_id: str):
+    session = await run_in_threadpool(get_upload_session, request, upload_id)
+    response.headers["Upload-Offset"] = str(session["offset"])
+    return session
+
+@router.put("/uploads/{upload_id}", response_model=schemas.UploadSessionStatus)
+@handle_errors
+async def upload_chunk(request: Request, response: Response, upload_id: str, offset: int = Query(..., ge=0)):
+    """Append the raw request body at ``offset``, which must equal the bytes received so far."""
+    session = await run_in_threadpool(get_upload_session, request, upload_id)
+    try:
+        appender = await run_in_threadpool(upload_sessions.get_staging().appender, session, offset)
+    except upload_sessions.UploadOffsetMismatch as e:
+        raise offset_conflict(e.offset)
+    except upload_sessions.UploadSessionBusy:
+        raise HTTPException(status_code=409, detail="Another chunk for this upload is in progress")
+
+    buffer = bytearray()
+    try:
+        async for data in request.stream():
+            buffer += data
+            if len(buffer) >= settings.UPLOAD_CHUNK_SIZE:
+                await run_in_threadpool(appender.write, bytes(buffer))
+                buffer.clear()
+        if buffer:
+            await run_in_threadpool(appender.write, bytes(buffer))
+    except upload_sessions.UploadTooLarge:
+        raise HTTPException(status_code=413, detail="Chunk goes past the declared total_size")
+    except ClientDisconnect:
+        # What was written stays; the client resumes from the offset it reads back.
+        pass
+    finally:
+        await run_in_threadpool(appender.close)
+
+    response.headers["Upload-Offset"] = str(appender.offset)
+    return {**session, "offset": appender.offset, "expires_at": time.time() + upload_sessions.get_staging().ttl}
+
+@router.post("/uploads/{upload_id}/complete")
+@handle_errors
+async def complete_upload(request: Request, upload_id: str, db: AsyncSession = Depends(endpoint_helper.get_async_db)):
+    session = await run_in_threadpool(get_upload_session, request, upload_id)
+    if session["offset"] != session["total_size"]:
+        raise offset_conflict(session["offset"])
+
+    user_id = session["user_id"]
+    user = await async_crud.get_user_principal(db, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    staging = upload_sessions.get_staging()
+    try:
+        data_path = await run_in_threadpool(staging.claim, upload_id)
+    except upload_sessions.UploadSessionNotFound:
+        raise HTTPException(status_code=409, detail="Upload is already being finalized")
+
+    item = schemas.UploadSessionCreate.model_validate(session["metadata"])
+    try:
+        def store_staged_file():
+            with open(data_path, "rb") as staged:
+                return storage.get_storage().put_file(staged)
+
+        file_hash, file_size = await run_in_threadpool(store_staged_file)
+        visit_record = await async_crud.add_new_visit_entry(
+            db, user_id, item.filename, item.hs_unique_code, file_hash, file_size,
+            item.place_name, item.person_name, item.address, item.person_position,
+            item.latitude, item.longitude, item.description, item.content_type,
+            before_commit=lambda visit: announce_visit(db, user, visit)
+        )
+    except BaseException:
+        await run_in_threadpool(staging.release, upload_id)
+        raise
+    await run_in_threadpool(staging.finish, upload_id)
+
+    logger.info(f"{FILE_NAME}:complete_upload", extra={"visit_id": visit_record.id, "upload_id": upload_id})
 
     return {
         "message": "Visit data uploaded successfully",
@@ -78,13 +403,23 @@ async def upload_visit_data(
 
 @router.get("/voice/{visit_id}")
 @handle_errors
-async def download_voice(visit_id: int, db: Session = Depends(endpoint_helper.get_db)):
-    visit = crud.get_visit_by_visit_id(db, visit_id)
+async def download_voice(
+    visit_id: int,
+    request: Request,
+    variant: Literal["compact", "original"] = "compact",
+    db: AsyncSession = Depends(endpoint_helper.get_async_db)
+):
+    visit = await async_crud.get_visit_metadata(db, visit_id)
     if not visit:
         raise HTTPException(status_code=404, detail="Voice not found")
 
-    return Response(
-        content=visit.file_data,
-        media_type=visit.content_type,
-        headers={"Content-Disposition": f"attachment; filename={visit.filename}"}
+    if variant == "compact" and visit.compact_file_hash and visit.compact_file_hash != visit.file_hash:
+        return await response_helper.blob_response(
+            request, visit.compact_file_hash, visit.compact_content_type, audio.compact_filename(visit.filename),
+            load_legacy_bytes=None
+        )
+
+    return await response_helper.blob_response(
+        request, visit.file_hash, visit.content_type, visit.filename,
+        load_legacy_bytes=lambda: async_crud.get_visit_file_data(db, visit_id)
     )
\ No newline at end of file
@@ -0,0 +1,354 @@
+"""Latency percentiles for the hot API paths under scripted load.
+
+Boots ``application.server_side:app`` under uvicorn in a background thread
+against a throwaway SQLite database (or ``--database-url``), with Celery in
+eager mode on the in-memory broker, an outbox relay thread and the stub
+Telegram server, then replays each scenario at the given concurrency::
+
+    python -m benchmarks.api_load --scenarios login,upload,download --requests 500 \\
+        --concurrency 32 --output results/$(git rev-parse --short HEAD).json
+
+Each scenario also records how far the process RSS grew, and
+``--max-rss-growth-mb`` fails the run when uploads stop being streamed.
+Results are written as JSON; compare two runs with ``python -m benchmarks.compare``.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+import httpx
+from benchmarks.telegram_stub import StubTelegramServer
+
+SCENARIOS = ("login", "upload", "download", "mixed")
+MIXED_WEIGHTS = {"login": 1, "upload": 2, "download": 7}
+PASSWORD = "benchmark-password"
+
+
+def configure_environment(workdir: str, database_url: str, telegram_url: str, iterations: int):
+    """Point the settings at local stand-ins; must run before ``application`` is imported."""
+    os.environ.update({
+        "DATABASE_URL": database_url or f"sqlite:///{workdir}/benchmark.db",
+        "CELERY_BROKER_URL": "memory://",
+        "STORAGE_PATH": f"{workdir}/storage",
+        "UPLOAD_STAGING_PATH": f"{workdir}/uploads",
+        "TELEGRAM_API_URL": telegram_url,
+        "TELEGRAM_RATE_PER_SECOND": "100000",
+        "TELEGRAM_RATE_BURST": "100000",
+        "PBKDF2_ITERATIONS": str(iterations),
+        "REDIS_URL": "",
+        # The scenarios log in and upload far faster than a real client; measure throughput, not 429s.
+        "RATE_LIMIT_ENABLED": "false",
+    })
+    for name, value in {
+        "PUBLIC_URL": "http://benchmark.local", "ACCESS_TOKEN_SECRET_KEY": "benchmark-access",
+        "REFRESH_TOKEN_SECRET_KEY": "benchmark-refresh", "ALGORITHM": "HS256", "ACCESS_TOKEN_EXP_MIN": "60",
+        "REFRESH_TOKEN_EXP_MIN": "600", "TELEGRAM_TOKEN": "benchmark", "TELEGRAM_CHAT_ID": "1",
+        "ERR_THREAD_ID": "2", "NEW_USER_THREAD_ID": "3", "INFO_THREAD_ID": "4", "VISITS_THREAD_ID": "5",
+    }.items():
+        os.environ.setdefault(name, value)
+
+
+def seed(users: int):
+    """Fresh schema with ``users`` reps (phones 0910000000N) sharing one password hash."""
+    from application import crud, hashers, models
+    from application.database import Base, SessionLocal, engine
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    hashed_password = hashers.make_password(PASSWORD)
+    phones = [f"0910{index:07d}" for index in range(users)]
+    with SessionLocal() as db:
+        db.add_all(
+            models.User(phone_number=phone, email=f"{phone}@benchmark.local", first_name="Bench",
+                        last_name=str(index), hashed_password=hashed_password, active=True)
+            for index, phone in enumerate(phones)
+        )
+        db.commit()
+        db.add(models.Admin(user_id=crud.get_user_by_phone_number(db, phones[0]).user_id, active=True))
+        db.commit()
+    return phones
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_api(port: int):
+    import uvicorn
+    from application.server_side import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+def start_relay(stop: threading.Event):
+    """Outbox relay thread; with eager Celery it runs the tasks against the stub Telegram server."""
+    from application import outbox
+    from application.database import SessionLocal
+
+    def relay():
+        while not stop.is_set():
+            with SessionLocal() as db:
+                sent = outbox.relay_batch(db, 200)
+            if not sent:
+                stop.wait(0.05)
+
+    thread = threading.Thread(target=relay, daemon=True)
+    thread.start()
+    return thread
+
+
+def current_rss() -> int:
+    """Resident set size in bytes; falls back to the lifetime peak where /proc is missing."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class RssSampler:
+    """Peak RSS of this process (API server and load generator together) while a scenario runs.
+
+    Upload bodies are streamed to disk, so the growth should stay around
+    ``concurrency * UPLOAD_CHUNK_SIZE`` rather than scale with the upload size.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.start = self.peak = current_rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+
+
+def summarize(name: str, latencies, statuses, elapsed: float, rss: RssSampler) -> dict:
+    ordered = sorted(latencies)
+
+    def percentile(q: float) -> float:
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)] * 1000
+
+    return {
+        "scenario": name,
+        "requests": len(ordered),
+        "errors": sum(count for status, count in statuses.items() if status >= 400),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "seconds": round(elapsed, 4),
+        "requests_per_second": round(len(ordered) / elapsed, 2),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": round(percentile(0.50), 3),
+        "p90_ms": round(percentile(0.90), 3),
+        "p99_ms": round(percentile(0.99), 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+        "rss_start_mb": round(rss.start / 2 ** 20, 2),
+        "rss_peak_mb": round(rss.peak / 2 ** 20, 2),
+        "rss_growth_mb": round((rss.peak - rss.start) / 2 ** 20, 2),
+    }
+
+
+class Workload:
+    """Request factories for each scenario, sharing one logged-in client for uploads and downloads."""
+
+    def __init__(self, base_url: str, phones, upload_size: int, concurrency: int):
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        self.base_url = base_url
+        self.phones = phones
+        self.audio = os.urandom(upload_size)
+        self.client = httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120)
+        self.anonymous = httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120)
+        self.visit_ids = []
+
+    async def prepare(self):
+        response = await self.client.post("/auth/login", json={"phone_number": self.phones[0], "password": PASSWORD})
+        response.raise_for_status()
+        for _ in range(10):
+            response = await self.upload()
+            response.raise_for_status()
+
+    async def login(self):
+        phone = random.choice(self.phones)
+        # A fresh cookie jar per request, so every call does the full password check.
+        return await self.anonymous.post(
+            "/auth/login", json={"phone_number": phone, "password": PASSWORD}, cookies=httpx.Cookies()
+        )
+
+    async def upload(self):
+        response = await self.client.post(
+            "/visit/upload",
+            data={"hs_unique_code": "BENCH", "place_name": "بنچمارک", "person_name": "Load", "address": "Tehran",
+                  "latitude": "35.7", "longitude": "51.4"},
+            files={"file": ("benchmark.mp3", self.audio, "audio/mpeg")},
+        )
+        if response.status_code == 200:
+            self.visit_ids.append(response.json()["id"])
+        return response
+
+    async def download(self):
+        return await self.client.get(f"/visit/voice/{random.choice(self.visit_ids)}", params={"variant": "original"})
+
+    async def mixed(self):
+        name = random.choices(list(MIXED_WEIGHTS), weights=list(MIXED_WEIGHTS.values()))[0]
+        return await getattr(self, name)()
+
+    async def run(self, name: str, requests: int, concurrency: int) -> dict:
+        make_request = getattr(self, name)
+        latencies, statuses = [], {}
+        remaining = iter(range(requests))
+
+        async def worker():
+            for _ in remaining:
+                start = time.perf_counter()
+                try:
+                    status = (await make_request()).status_code
+                except httpx.HTTPError:
+                    status = 599
+                latencies.append(time.perf_counter() - start)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        with RssSampler() as rss:
+            start = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            elapsed = time.perf_counter() - start
+        return summarize(name, latencies, statuses, elapsed, rss)
+
+    async def close(self):
+        await self.client.aclose()
+        await self.anonymous.aclose()
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_scenarios(base_url: str, phones, args) -> list:
+    workload = Workload(base_url, phones, args.upload_size, args.concurrency)
+    try:
+        await workload.prepare()
+        results = []
+        for name in args.scenarios:
+            if args.warmup:
+                await workload.run(name, args.warmup, args.concurrency)
+            result = await workload.run(name, args.requests, args.concurrency)
+            print(json.dumps(result))
+            results.append(result)
+        return results
+    finally:
+        await workload.close()
+
+
+def scenario_list(value: str):
+    names = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    return names
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.api_load")
+    parser.add_argument("--scenarios", type=scenario_list, default=list(SCENARIOS[:3]),
+                        help=f"comma separated, from {', '.join(SCENARIOS)}")
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests before each scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--upload-size", type=int, default=2 * 1024 * 1024, help="bytes per uploaded recording")
+    parser.add_argument("--pbkdf2-iterations", type=int, default=600000)
+    parser.add_argument("--database-url", default=None, help="sync SQLAlchemy URL; defaults to a temporary SQLite file")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="write the results JSON here")
+    parser.add_argument("--max-rss-growth-mb", type=float, default=None,
+                        help="exit 1 when a scenario grows RSS by more than this, e.g. from buffering uploads")
+    parser.add_argument("--app-log-level", default="WARNING", help="level for the application loggers")
+    args = parser.parse_args(argv)
+    random.seed(args.seed)
+
+    telegram = StubTelegramServer().start()
+    with tempfile.TemporaryDirectory(prefix="telavang-bench-") as workdir:
+        configure_environment(workdir, args.database_url, telegram.url, args.pbkdf2_iterations)
+        from application.tasks import celery_app
+        from application.logger_config import celery_logger, logger
+        celery_app.conf.task_always_eager = True
+        logger.setLevel(args.app_log_level)
+        celery_logger.setLevel(args.app_log_level)
+
+        phones = seed(args.users)
+        port = free_port()
+        server, server_thread = start_api(port)
+        stop_relay = threading.Event()
+        relay_thread = start_relay(stop_relay)
+        try:
+            results = asyncio.run(run_scenarios(f"http://127.0.0.1:{port}", phones, args))
+        finally:
+            server.should_exit = True
+            server_thread.join()
+            stop_relay.set()
+            relay_thread.join()
+            telegram.stop()
+
+        from application.setting import settings
+        report = {
+            "revision": git_revision(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "database": settings.DATABASE_URL.split(":", 1)[0],
+            "config": {
+                "concurrency": args.concurrency, "requests": args.requests, "users": args.users,
+                "upload_size": args.upload_size, "password_hasher": settings.PASSWORD_HASHER,
+                "pbkdf2_iterations": settings.PBKDF2_ITERATIONS, "password_hash_pool": settings.PASSWORD_HASH_POOL,
+                "rate_limit_enabled": settings.RATE_LIMIT_ENABLED,
+            },
+            "telegram_calls": telegram.calls,
+            "scenarios": results,
+        }
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2, ensure_ascii=False)
+
+    if args.max_rss_growth_mb is not None:
+        over = [result["scenario"] for result in results if result["rss_growth_mb"] > args.max_rss_growth_mb]
+        if over:
+            print(json.dumps({"rss_growth_exceeded": over, "max_rss_growth_mb": args.max_rss_growth_mb}))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+"""Per-scenario latency and throughput deltas between two ``api_load`` result files.
+
+Exits non-zero when any scenario regresses by more than ``--threshold``::
+
+    python -m benchmarks.compare results/base.json results/head.json --threshold 0.10
+"""
+import argparse
+import json
+import sys
+
+# metric -> True when a larger value is better
+METRICS = {"p50_ms": False, "p99_ms": False, "requests_per_second": True, "rss_growth_mb": False}
+
+
+def load(path: str) -> dict:
+    with open(path) as result_file:
+        report = json.load(result_file)
+    return {scenario["scenario"]: scenario for scenario in report["scenarios"]}
+
+
+def compare(base: dict, head: dict, threshold: float):
+    rows, regressions = [], []
+    for name in base.keys() & head.keys():
+        for metric, higher_is_better in METRICS.items():
+            before, after = base[name].get(metric), head[name].get(metric)
+            if before is None or after is None:
+                continue
+            change = (after - before) / before if before else 0.0
+            regressed = (-change if higher_is_better else change) > threshold
+            row = {"scenario": name, "metric": metric, "base": before, "head": after,
+                   "change": round(change, 4), "regressed": regressed}
+            rows.append(row)
+            if regressed:
+                regressions.append(row)
+    return sorted(rows, key=lambda row: (row["scenario"], row["metric"])), regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.compare")
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative slowdown per metric")
+    args = parser.parse_args(argv)
+
+    base, head = load(args.base), load(args.head)
+    rows, regressions = compare(base, head, args.threshold)
+    for row in rows:
+        print(json.dumps(row))
+    for name in sorted(base.keys() ^ head.keys()):
+        print(json.dumps({"scenario": name, "skipped": "only in one result file"}))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
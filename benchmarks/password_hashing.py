@@ -0,0 +1,54 @@
+"""Login hashing throughput versus pool size.
+
+Runs ``hashers.verify_password`` for a batch of concurrent "logins" with the
+configured algorithm and prints one JSON line per pool size, e.g.::
+
+    python -m benchmarks.password_hashing --logins 200 --pool thread
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+
+async def run_batch(hashers, encoded: str, logins: int):
+    start = time.perf_counter()
+    results = await asyncio.gather(*(hashers.verify_password("benchmark-password", encoded) for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    assert all(valid for valid, _ in results)
+    return elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.password_hashing")
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--pool", choices=("thread", "process"), default="thread")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+
+    from application import hashers
+    from application.setting import settings
+
+    settings.PASSWORD_HASH_POOL = args.pool
+    encoded = hashers.make_password("benchmark-password")
+
+    workers = 1
+    while workers <= args.max_workers:
+        settings.PASSWORD_HASH_WORKERS = workers
+        hashers.shutdown_executor()
+        elapsed = asyncio.run(run_batch(hashers, encoded, args.logins))
+        print(json.dumps({
+            "algorithm": settings.PASSWORD_HASHER,
+            "pool": args.pool,
+            "workers": workers,
+            "logins": args.logins,
+            "seconds": round(elapsed, 4),
+            "logins_per_second": round(args.logins / elapsed, 2),
+        }))
+        workers *= 2
+    hashers.shutdown_executor()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Minimal local stand-in for the Telegram Bot API, for benchmarks."""
+import itertools
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubTelegramHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        server = self.server
+        method = self.path.rsplit("/", 1)[-1]
+        with server.lock:
+            server.calls[method] = server.calls.get(method, 0) + 1
+            request_number = next(server.counter)
+
+        if server.rate_limit_every and request_number % server.rate_limit_every == 0:
+            status, body = 429, {"ok": False, "error_code": 429, "parameters": {"retry_after": 1}}
+        else:
+            result = {"message_id": request_number}
+            if method == "sendVoice":
+                result["voice"] = {"file_id": f"stub-file-{request_number}"}
+            status, body = 200, {"ok": True, "result": result}
+
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubTelegramServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, rate_limit_every: int = 0):
+        super().__init__((host, port), StubTelegramHandler)
+        self.rate_limit_every = rate_limit_every
+        self.calls = {}
+        self.counter = itertools.count(1)
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,64 @@
+"""Messages/sec a Celery worker's Telegram client sustains against a local stub.
+
+Compares the pooled keep-alive client with a fresh connection per message::
+
+    python -m benchmarks.telegram_throughput --messages 500 --threads 4
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+from benchmarks.telegram_stub import StubTelegramServer
+
+
+def run(send, messages: int, threads: int) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(send, range(messages)))
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.telegram_throughput")
+    parser.add_argument("--messages", type=int, default=300)
+    parser.add_argument("--threads", type=int, default=4, help="worker --concurrency to simulate")
+    parser.add_argument("--rate", type=float, default=1000.0, help="limiter rate per chat/thread")
+    args = parser.parse_args(argv)
+
+    server = StubTelegramServer().start()
+    from application.setting import settings
+    from application import telegram
+
+    settings.TELEGRAM_API_URL = server.url
+    settings.TELEGRAM_RATE_PER_SECOND = args.rate
+    settings.TELEGRAM_RATE_BURST = args.rate
+    settings.TELEGRAM_MAX_LIMITER_WAIT = float("inf")
+    client = telegram.get_client()
+
+    def pooled(i):
+        client.send_message(settings.TELEGRAM_CHAT_ID, f"message {i}", settings.INFO_THREAD_ID)
+
+    def unpooled(i):
+        httpx.post(
+            f"{server.url}/bot{settings.TELEGRAM_TOKEN}/sendMessage",
+            json={"chat_id": settings.TELEGRAM_CHAT_ID, "text": f"message {i}"},
+        ).raise_for_status()
+
+    try:
+        for name, send in (("pooled", pooled), ("connection_per_message", unpooled)):
+            elapsed = run(send, args.messages, args.threads)
+            print(json.dumps({
+                "client": name,
+                "messages": args.messages,
+                "threads": args.threads,
+                "seconds": round(elapsed, 4),
+                "messages_per_second": round(args.messages / elapsed, 2),
+            }))
+    finally:
+        client.close()
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
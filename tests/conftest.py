@@ -0,0 +1,63 @@
+"""Test harness: settings point at a throwaway SQLite database and storage directory.
+
+The environment has to be in place before ``application`` is imported, so
+it is set up at module level rather than in a fixture.
+"""
+import os
+import tempfile
+
+WORKDIR = tempfile.mkdtemp(prefix="telavang-tests-")
+
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{WORKDIR}/test.db",
+    "CELERY_BROKER_URL": "memory://",
+    "STORAGE_PATH": f"{WORKDIR}/storage",
+    "UPLOAD_STAGING_PATH": f"{WORKDIR}/uploads",
+    "REDIS_URL": "",
+    "RATE_LIMIT_ENABLED": "false",
+    "PBKDF2_ITERATIONS": "1000",
+})
+for name, value in {
+    "PUBLIC_URL": "http://testserver", "ACCESS_TOKEN_SECRET_KEY": "test-access",
+    "REFRESH_TOKEN_SECRET_KEY": "test-refresh", "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXP_MIN": "30", "REFRESH_TOKEN_EXP_MIN": "600", "TELEGRAM_TOKEN": "test",
+    "TELEGRAM_CHAT_ID": "1", "ERR_THREAD_ID": "2", "NEW_USER_THREAD_ID": "3",
+    "INFO_THREAD_ID": "4", "VISITS_THREAD_ID": "5",
+}.items():
+    os.environ.setdefault(name, value)
+
+import pytest
+from fastapi.testclient import TestClient
+
+ADMIN = {
+    "phone_number": "09120000000", "email": "admin@example.com", "first_name": "Admin",
+    "last_name": "Test", "password": "admin-password", "active": True,
+}
+
+
+@pytest.fixture(scope="session")
+def app():
+    from application.database import Base, engine
+    from application.server_side import app
+    Base.metadata.create_all(engine)
+    return app
+
+
+@pytest.fixture(scope="session")
+def admin_client(app):
+    """Client logged in as the admin created through ``/admin/init``; runs the app lifespan once."""
+    with TestClient(app) as client:
+        assert client.post("/admin/init", json=ADMIN).status_code == 200
+        login = client.post("/auth/login", json={"phone_number": ADMIN["phone_number"], "password": ADMIN["password"]})
+        assert login.status_code == 200
+        yield client
+
+
+@pytest.fixture
+def db():
+    from application.database import SessionLocal
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
@@ -0,0 +1,27 @@
+import io
+import json
+import zipfile
+from datetime import datetime
+from application import models
+
+VISIT_FORM = {"hs_unique_code": "hs-export", "place_name": "Shop", "person_name": "Owner", "address": "Street 1"}
+
+
+def test_zip_export_handles_timestamps_outside_the_zip_date_range(admin_client, db):
+    for timestamp in (datetime(1970, 1, 1), datetime(2150, 6, 1)):
+        response = admin_client.post(
+            "/visit/upload", data=VISIT_FORM, files={"file": ("voice.mp3", b"audio-bytes", "audio/mpeg")}
+        )
+        assert response.status_code == 200
+        visit_id = response.json()["id"]
+        db.query(models.VisitData).filter_by(id=visit_id).update({"visit_timestamp": timestamp})
+        db.commit()
+
+    response = admin_client.get("/visit/export", params={"format": "zip", "hs_unique_code": "hs-export"})
+    assert response.status_code == 200
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    assert archive.testzip() is None
+    rows = [json.loads(line) for line in archive.read("visits.ndjson").splitlines()]
+    assert sorted(row["visit_timestamp"][:4] for row in rows) == ["1970", "2150"]
+    for row in rows:
+        assert archive.read(row["audio_path"]) == b"audio-bytes"
@@ -0,0 +1,32 @@
+import asyncio
+from application import schemas
+from application.helper import principal_cache
+
+
+class Admin:
+    def __init__(self, admin_id, user_id, active=True):
+        self.admin_id, self.user_id, self.active = admin_id, user_id, active
+
+
+def test_load_racing_an_invalidation_is_not_cached():
+    loads = []
+
+    async def stale_load():
+        # remove_admin commits and invalidates while this request is still loading the old row.
+        loads.append("stale")
+        await principal_cache.invalidate("admin", 42)
+        return Admin(1, 42)
+
+    async def fresh_load():
+        loads.append("fresh")
+        return None
+
+    async def scenario():
+        first = await principal_cache.get("admin", 42, schemas.AdminPrincipal, stale_load)
+        second = await principal_cache.get("admin", 42, schemas.AdminPrincipal, fresh_load)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first is not None
+    assert second is None
+    assert loads == ["stale", "fresh"]
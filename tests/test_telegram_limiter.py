@@ -0,0 +1,67 @@
+from unittest import mock
+import httpx
+from celery.canvas import Signature
+from application import tasks, telegram
+from application.setting import settings
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def make_client(posts: list):
+    def handler(request):
+        posts.append(request)
+        return httpx.Response(200, json={"ok": True, "result": {}})
+
+    client = telegram.TelegramClient("token", "http://telegram.test")
+    client._http = httpx.Client(transport=httpx.MockTransport(handler), base_url="http://telegram.test/bottoken/")
+    return client
+
+
+def test_deferred_calls_keep_their_slot_and_all_get_sent():
+    clock, posts = FakeClock(), []
+    client = make_client(posts)
+    deferred = []
+    with mock.patch.object(telegram.time, "monotonic", clock.monotonic), \
+            mock.patch.object(telegram.time, "sleep", clock.sleep):
+        for index in range(100):
+            try:
+                client.send_message(1, f"message {index}", message_thread_id=2)
+            except telegram.TelegramRetryAfter as e:
+                assert e.reserved
+                deferred.append(clock.now + e.retry_after)
+
+        # Every deferral got its own slot, one refill interval after the previous one.
+        assert len(set(deferred)) == len(deferred)
+        assert min(b - a for a, b in zip(deferred, deferred[1:])) >= 1 / settings.TELEGRAM_RATE_PER_SECOND - 1e-6
+
+        for slot in deferred:
+            clock.now = slot
+            client.send_message(1, "retried", message_thread_id=2, reserved=True)
+
+    assert len(posts) == 100
+
+
+def test_only_telegram_429s_use_up_the_retry_budget():
+    sent = []
+    with mock.patch.object(Signature, "apply_async", lambda signature, *args, **kwargs: sent.append(signature)), \
+            mock.patch.object(tasks, "get_client") as get_client:
+        get_client.return_value.send_message.side_effect = telegram.TelegramRetryAfter(30, reserved=True)
+        tasks.report_to_admin_api.apply(args=("message",), retries=settings.TELEGRAM_RATE_LIMIT_RETRIES)
+
+        get_client.return_value.send_message.side_effect = telegram.TelegramRetryAfter(30)
+        result = tasks.report_to_admin_api.apply(args=("message",), retries=settings.TELEGRAM_RATE_LIMIT_RETRIES)
+
+    assert len(sent) == 1
+    assert sent[0].kwargs["reserved"] is True
+    assert sent[0].options["retries"] == settings.TELEGRAM_RATE_LIMIT_RETRIES
+    assert sent[0].options["countdown"] == 30
+    assert isinstance(result.result, telegram.TelegramRetryAfter)
@@ -0,0 +1,66 @@
+import asyncio
+import tracemalloc
+import httpx
+from application import models, storage
+from application.setting import settings
+
+CONCURRENT_UPLOADS = 8
+FILE_SIZE = 16 * 1024 * 1024
+BODY_CHUNK = 64 * 1024
+# Starlette spools each multipart file part in memory up to 1MB before moving it to disk.
+MULTIPART_SPOOL = 1024 * 1024
+BOUNDARY = "memory-test-boundary"
+
+
+def multipart_upload(index: int):
+    """Streamed ``/visit/upload`` body; the file part is yielded in slices of one shared buffer."""
+    fields = {"hs_unique_code": f"hs-memory-{index}", "place_name": "Shop", "person_name": "Owner", "address": "Street 1"}
+    head = b"".join(
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        for name, value in fields.items()
+    ) + (
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="voice-{index}.mp3"\r\n'
+        f'Content-Type: audio/mpeg\r\n\r\n'
+    ).encode()
+    tail = f"\r\n--{BOUNDARY}--\r\n".encode()
+    chunk = bytes([index]) * BODY_CHUNK
+
+    async def body():
+        yield head
+        for _ in range(FILE_SIZE // BODY_CHUNK):
+            yield chunk
+        yield tail
+
+    headers = {
+        "content-type": f"multipart/form-data; boundary={BOUNDARY}",
+        "content-length": str(len(head) + FILE_SIZE + len(tail)),
+    }
+    return body(), headers
+
+
+async def upload_concurrently(app, cookies):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver", cookies=cookies) as client:
+        async def upload(index):
+            body, headers = multipart_upload(index)
+            return await client.post("/visit/upload", content=body, headers=headers, timeout=120)
+
+        return await asyncio.gather(*(upload(index) for index in range(CONCURRENT_UPLOADS)))
+
+
+def test_concurrent_large_uploads_use_chunk_bounded_memory(app, admin_client, db):
+    tracemalloc.start()
+    try:
+        responses = asyncio.run(upload_concurrently(app, dict(admin_client.cookies)))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert [response.status_code for response in responses] == [200] * CONCURRENT_UPLOADS
+    visit_ids = [response.json()["id"] for response in responses]
+    sizes = db.query(models.VisitData.file_size).filter(models.VisitData.id.in_(visit_ids)).all()
+    assert [size for size, in sizes] == [FILE_SIZE] * CONCURRENT_UPLOADS
+
+    per_upload = MULTIPART_SPOOL + settings.UPLOAD_CHUNK_SIZE + storage.CHUNK_SIZE + 2 * BODY_CHUNK
+    assert peak < CONCURRENT_UPLOADS * per_upload
+    assert peak < CONCURRENT_UPLOADS * FILE_SIZE / 4